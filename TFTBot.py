@@ -1,18 +1,36 @@
 import os
+import json
+import time
+import shutil
+import tempfile
+import asyncio
 import logging
 import argparse
+from collections import deque
+from typing import TYPE_CHECKING
+
+# Start of the time to ready, everything below is part of the cold start
+STARTED = time.perf_counter()
 
 import discord
 from discord import Reaction, Member, User, Message
 from discord.ext import commands
 
-from riot_api import RiotAPI
-import envs
-
-envs.set_envs()
-
-# Initialize logging
-logging.basicConfig(level=logging.INFO)
+from riot_api import RiotAPI, NOT_FOUND, format_analysis
+from compact_match import MatchCache
+from match_store import MatchStore
+from ingest import LadderIngestor, IngestProgress
+from match_store import participant_rows
+from live_game import lobby_stats, format_live, refresh_interval
+from profiling import Profiler, trace_stage
+from export import export_history, safe_stem, FORMATS, DEFAULT_MAX_BYTES
+
+# NumPy (meta statistics) and Pillow (board images) are imported in the background once the bot starts,
+# aiohttp.web (HTTP API) only if the HTTP API is enabled
+if TYPE_CHECKING:
+    from meta_stats import MetaStats
+    from board_render import BoardRenderer
+    from http_api import HTTPAPI
 
 # Initialize the bot with the correct intents
 intents = discord.Intents.default()
@@ -22,19 +40,39 @@ BOT: commands.Bot = commands.Bot(command_prefix="!", intents=intents)
 
 global MAN_MSG
 MAN_MSG: dict[int, dict[str, list[str] | str, int]] = {}  # Dictionary to hold message IDs and their corresponding data
+MAN_MSG_ORDER: deque[int] = deque()  # Tracked message IDs, oldest first
+MAX_TRACKED_MESSAGES = 1000  # Older messages are no longer paged
 RIOT_API: RiotAPI = None
+MATCH_STORE: MatchStore = None
+META_STATS: "MetaStats" = None  # Loaded in the background on startup
+BOARD_RENDERER: "BoardRenderer" = None
+BOARD_CHANNEL_ID: int = None  # Channel the rendered boards are uploaded to, rendering is disabled without it
+LIVE_WATCHES: dict[str, asyncio.Task] = {}  # puuid -> task keeping a live game embed up to date
+MAX_LIVE_WATCH = 60 * 60  # Seconds after which a live game embed stops refreshing
+MAX_EXPORT_MATCHES = 1000
+INGESTING: set[str] = set()  # Tiers with a running ingestion, runs of one tier share its checkpoint file
+PROFILER: Profiler = Profiler()
+PROFILE_ON_START = False
+HTTP_API: "HTTPAPI" = None
+BACKGROUND_TASKS: set[asyncio.Task] = set()  # Strong references so running tasks are not garbage collected
+WARMUP: asyncio.Task = None
+WARMUP_STEPS = {"riot_warmup": "Riot API", "store_warmup": "match store", "board_warmup": "boards"}  # Warmup step -> log label
+READINESS: dict = None  # Set once the bot is ready, see on_ready
+READY_FILE: str = None
 
 def initialize_shared_state(shared_dict):
     """
     Initializes a shared state by assigning the provided dictionary to a global variable.
+    The eviction order of the previously tracked messages is discarded.
 
     Args:
         shared_dict (dict): A dictionary to be shared across different parts of the program.
     """
     global MAN_MSG
     MAN_MSG = shared_dict
+    MAN_MSG_ORDER.clear()
 
-def generate_embed(page, pages, summoner):
+def generate_embed(page, pages, summoner, image_url=None):
     """
     Generates a Discord embed object for displaying analysis information.
 
@@ -42,15 +80,57 @@ def generate_embed(page, pages, summoner):
         page (int): The current page index (0-based) to display.
         pages (list of str): A list of strings where each string represents the content of a page.
         summoner (str): The name of the summoner for whom the analysis is being generated.
+        image_url (str | None): URL of the rendered board shown below the page, if any.
 
     Returns:
         discord.Embed: A Discord embed object containing the analysis information for the specified page.
     """
-    return discord.Embed(
+    embed = discord.Embed(
         title=f"{summoner} Analysis (Page {page + 1}/{len(pages)})",
         description=pages[page],
         color=discord.Color.blue()
     )
+    if image_url:
+        embed.set_image(url=image_url)
+    return embed
+
+async def board_image(match_id, boards, page):
+    """
+    Returns the URL of the rendered board belonging to a page of a tracked message.
+
+    Args:
+        match_id (str | None): The match the boards belong to.
+        boards (list[dict] | None): The participant boards (see `match_store.participant_rows`) in page order.
+        page (int): The page index (0-based), page i shows the board of participant i.
+
+    Returns:
+        str | None: The attachment URL, or None if rendering is disabled or the page has no board.
+    """
+    if BOARD_RENDERER is None or not match_id or not boards or page >= len(boards):
+        return None
+    channel = BOT.get_channel(BOARD_CHANNEL_ID)
+    if channel is None:
+        return None
+    return await BOARD_RENDERER.image_url(match_id, boards[page], channel)
+
+async def entry_pages(entry):
+    """
+    Returns the pages and boards of a tracked message.
+
+    Match analyses only keep their match ID in MAN_MSG, their pages and boards are rebuilt from
+    the match cache (or the match store) instead of holding the rendered pages of every message.
+
+    Args:
+        entry (dict): The MAN_MSG entry of the message.
+
+    Returns:
+        tuple[list[str], list[dict] | None]: The pages and, if board rendering is enabled, the boards.
+    """
+    if 'p' in entry:
+        return entry['p'], None
+    match_data = await RIOT_API.get_tft_match_summary(entry['m'])
+    boards = participant_rows(match_data) if BOARD_RENDERER is not None and match_data and 'info' in match_data else None
+    return format_analysis(match_data), boards
 
 @BOT.event
 @commands.has_permissions(manage_messages=True) # Check if the bot has the permission
@@ -69,12 +149,14 @@ async def on_reaction_add(reaction: Reaction, user: Member | User):
         - ⬅️ decreases the current page index if it is greater than 0.
         - ➡️ increases the current page index if it is less than the total number of pages - 1.
         - The message content is updated with the new page using the `generate_embed` function.
+        - The rendered board of the new page is reused from an earlier upload when possible.
         - The user's reaction is removed after processing.
         - The current page index is updated in the MAN_MSG dictionary.
     Global Variables:
         MAN_MSG (dict): A global dictionary that tracks paginated messages. Each entry contains:
             - 'cp': The current page index.
-            - 'p': The list of pages (content).
+            - 'p': The list of pages (content), or
+            - 'm': The analyzed match, its pages and boards are rebuilt from the match cache.
             - 's': The summoner or associated data for the message.
     Notes:
         - The function ensures that the bot does not respond to its own reactions.
@@ -82,26 +164,29 @@ async def on_reaction_add(reaction: Reaction, user: Member | User):
     """
     global MAN_MSG
     if reaction.message.id in MAN_MSG and user != BOT.user and reaction.emoji in ["⬅️", "➡️"]:
-        current_page = MAN_MSG[reaction.message.id]['cp']
-        pages = MAN_MSG[reaction.message.id]['p']
-        summoner = MAN_MSG[reaction.message.id]['s']
+        entry = MAN_MSG[reaction.message.id]
+        current_page = entry['cp']
+        pages, boards = await entry_pages(entry)
+        summoner = entry['s']
         total_pages = len(pages)
         if str(reaction.emoji) == "⬅️" and current_page > 0:
             current_page -= 1
-            await reaction.message.edit(embed=generate_embed(current_page, pages, summoner))
+            image_url = await board_image(entry.get('m'), boards, current_page)
+            await reaction.message.edit(embed=generate_embed(current_page, pages, summoner, image_url))
         elif str(reaction.emoji) == "➡️" and current_page < total_pages - 1:
             current_page += 1
-            await reaction.message.edit(embed=generate_embed(current_page, pages, summoner))
+            image_url = await board_image(entry.get('m'), boards, current_page)
+            await reaction.message.edit(embed=generate_embed(current_page, pages, summoner, image_url))
 
         # Remove the user's reaction after processing
         await reaction.message.remove_reaction(reaction.emoji, user)
 
-        MAN_MSG[reaction.message.id] = {"p":pages, "cp": current_page, "s": summoner}  # Update current page in the dictionary
-        logging.info(f"MAN_MSG updated: {MAN_MSG[reaction.message.id]["cp"]}")
+        MAN_MSG[reaction.message.id] = {**entry, "cp": current_page}  # Update current page in the dictionary
+        logging.info(f"MAN_MSG updated: {current_page}")
 
 
 # Helper function to send a long message in pages (each page dedicated to a player)
-async def send_analysis_pages(ctx, analysis_data, summoner_name):
+async def send_analysis_pages(ctx, analysis_data, summoner_name, match_id=None, boards=None):
     """
     Sends a paginated analysis report as an embedded message to the Discord channel.
     This function sends an initial embed message containing analysis data for a summoner
@@ -112,24 +197,38 @@ async def send_analysis_pages(ctx, analysis_data, summoner_name):
         analysis_data (list): A list of analysis data, where each entry corresponds to
             a player's data to be displayed on a separate page.
         summoner_name (str): The name of the summoner for whom the analysis is being generated.
+        match_id (str | None): The analyzed match. Its entry keeps only the match ID, the pages
+            are rebuilt from the match cache when the message is paged.
+        boards (list[dict] | None): The participant boards (see `match_store.participant_rows`)
+            in page order, rendered below the pages if board rendering is enabled.
     Side Effects:
         - Sends an embed message to the Discord channel.
         - Adds reaction emojis ("⬅️" and "➡️") to the message for navigation.
-        - Updates the global `MAN_MSG` dictionary to track the message ID, analysis data,
-          current page index, and summoner name.
+        - Updates the global `MAN_MSG` dictionary to track the message ID, analysis data
+          (or analyzed match), current page index, and summoner name. Only the latest
+          `MAX_TRACKED_MESSAGES` messages are tracked.
     Note:
         This function assumes the existence of a `generate_embed` function to create
         the embed for each page and a global `MAN_MSG` dictionary for managing state.
     """
+    entry = {"m": match_id} if match_id else {"p": analysis_data}
+    entry.update({"cp": 0, "s": summoner_name})
+
     # Calculate number of pages required (each page will hold 1 player's data)
-    message: Message = await ctx.send(embed=generate_embed(0, analysis_data, summoner_name))
+    with trace_stage("render"):
+        image_url = await board_image(match_id, boards, 0)
+    with trace_stage("discord"):
+        message: Message = await ctx.send(embed=generate_embed(0, analysis_data, summoner_name, image_url))
 
-    # Add reaction emojis for navigation
-    await message.add_reaction("⬅️")  # Left arrow (previous)
-    await message.add_reaction("➡️")  # Right arrow (next)
+        # Add reaction emojis for navigation
+        await message.add_reaction("⬅️")  # Left arrow (previous)
+        await message.add_reaction("➡️")  # Right arrow (next)
 
     global MAN_MSG
-    MAN_MSG[message.id] = {"p":analysis_data, "cp": 0, "s": summoner_name}
+    MAN_MSG[message.id] = entry
+    MAN_MSG_ORDER.append(message.id)
+    while len(MAN_MSG_ORDER) > MAX_TRACKED_MESSAGES:
+        MAN_MSG.pop(MAN_MSG_ORDER.popleft(), None)
 
 
 # Command to analyze a player's most recent game
@@ -155,10 +254,12 @@ async def analyze(ctx, summoner_name):
         - Sends the analysis results as paginated messages to the Discord channel.
     """
     # Show loading message
-    loading_message: Message = await ctx.send("Fetching data... Please wait.")
+    with trace_stage("discord"):
+        loading_message: Message = await ctx.send("Fetching data... Please wait.")
 
     # Fetch summoner data
-    summoner_data = await RIOT_API.get_summoner_data(summoner_name)
+    with trace_stage("analyze.summoner"):
+        summoner_data = await RIOT_API.get_summoner_data(summoner_name)
 
     if not summoner_data:
         embed = discord.Embed(
@@ -181,7 +282,8 @@ async def analyze(ctx, summoner_name):
         return
 
     # Fetch match history using the puuid
-    match_history = await RIOT_API.get_tft_match_history(puuid)
+    with trace_stage("analyze.history"):
+        match_history = await RIOT_API.get_tft_match_history(puuid)
 
     if not match_history:
         embed = discord.Embed(
@@ -195,54 +297,549 @@ async def analyze(ctx, summoner_name):
     match_id = match_history[0]
 
     # Analyze the most recent match
-    analysis = await RIOT_API.analyze_tft_game(match_id)
+    with trace_stage("analyze.match"):
+        match_data = await RIOT_API.get_tft_match_summary(match_id)
+        analysis = format_analysis(match_data)
+
+        boards = None
+        if match_data and 'info' in match_data:
+            if BOARD_RENDERER is not None:
+                boards = participant_rows(match_data)
+        else:
+            match_id = None  # Keep the error page itself, there is no match to rebuild it from
 
     # Delete the loading message now that we have the data
-    await loading_message.delete()
+    with trace_stage("discord"):
+        await loading_message.delete()
 
     # Send the analysis pages
-    await send_analysis_pages(ctx, analysis, summoner_name)
+    await send_analysis_pages(ctx, analysis, summoner_name, match_id, boards)
+
+
+def generate_live_embed(summoner, description, ended=False):
+    """
+    Generates a Discord embed object for displaying an ongoing game.
+
+    Args:
+        summoner (str): The name of the summoner whose game is shown.
+        description (str): The formatted game, see `live_game.format_live`.
+        ended (bool): Whether the game has ended since, the embed then stops refreshing.
+
+    Returns:
+        discord.Embed: A Discord embed object containing the ongoing game.
+    """
+    return discord.Embed(
+        title=f"{summoner} Live Game" + (" (Ended)" if ended else ""),
+        description=description,
+        color=discord.Color.dark_grey() if ended else discord.Color.green()
+    )
+
+
+async def watch_live(message: Message, summoner_name, puuid, game):
+    """
+    Keeps a live game embed up to date until the game ends.
+    Args:
+        message (Message): The message holding the live game embed.
+        summoner_name (str): The name of the summoner whose game is shown.
+        puuid (str): The puuid of the summoner.
+        game (dict): The active game shown in the message.
+    Behavior:
+        - Waits an adaptive interval (see `live_game.refresh_interval`) between refreshes.
+        - Active games and lobby stats come from the caches of `RIOT_API` whenever possible.
+        - Marks the embed as ended once the summoner is no longer in that game and stops.
+        - Stops after `MAX_LIVE_WATCH` seconds or when the message was deleted.
+    """
+    started = time.monotonic()
+    description = message.embeds[0].description if message.embeds else ""
+    try:
+        while time.monotonic() - started < MAX_LIVE_WATCH:
+            await asyncio.sleep(refresh_interval(RIOT_API, game))
+            current = await RIOT_API.get_active_game(puuid)
+            if current is None:  # Transient error, try again next interval
+                continue
+            if current is NOT_FOUND or current.get('gameId') != game.get('gameId'):
+                await message.edit(embed=generate_live_embed(summoner_name, description, ended=True))
+                return
+            game = current
+            description = format_live(game, await lobby_stats(RIOT_API, game))
+            await message.edit(embed=generate_live_embed(summoner_name, description))
+    except discord.NotFound:
+        logging.info(f"Live game message of {summoner_name} was deleted, stopped refreshing")
+
+
+# Command to show a player's ongoing game
+@BOT.command(name="live", help="Show a player's ongoing TFT game, add 'watch' to keep it updated")
+async def live(ctx, summoner_name, mode=None):
+    """
+    Shows the ongoing Teamfight Tactics (TFT) game of a summoner and the recent results of the lobby.
+    Args:
+        ctx (commands.Context): The context of the command invocation, used to interact with Discord.
+        summoner_name (str): The name of the summoner to look up.
+        mode (str | None): "watch" keeps the embed updated until the game ends.
+    Behavior:
+        - Displays a loading message while fetching data.
+        - Sends an error embed if the summoner is not found or not in a game.
+        - Fetches the recent placements of all lobby participants concurrently, within the rate budget.
+        - With "watch", refreshes the embed in place (at most one refreshing embed per summoner).
+    """
+    loading_message: Message = await ctx.send("Fetching data... Please wait.")
+
+    summoner_data = await RIOT_API.get_summoner_data(summoner_name)
+    puuid = summoner_data.get('puuid') if summoner_data else None
+    if not puuid:
+        embed = discord.Embed(
+            title="Error",
+            description=f"Could not find summoner **{summoner_name}**. Please check the name and try again.",
+            color=discord.Color.red()
+        )
+        await loading_message.edit(content="Error occurred.", embed=embed)
+        return
+
+    game = await RIOT_API.get_active_game(puuid)
+    if game is None or game is NOT_FOUND:
+        embed = discord.Embed(
+            title="Error",
+            description=f"**{summoner_name}** is not in a game right now." if game is NOT_FOUND
+                        else f"Could not fetch the ongoing game of **{summoner_name}**.",
+            color=discord.Color.red()
+        )
+        await loading_message.edit(content="Error occurred.", embed=embed)
+        return
+
+    players = await lobby_stats(RIOT_API, game)
+
+    await loading_message.delete()
+    message: Message = await ctx.send(embed=generate_live_embed(summoner_name, format_live(game, players)))
+
+    if mode == "watch" and puuid not in LIVE_WATCHES:
+        task = asyncio.create_task(watch_live(message, summoner_name, puuid, game))
+        LIVE_WATCHES[puuid] = task
+        task.add_done_callback(lambda _: LIVE_WATCHES.pop(puuid, None))
+
+
+# Command to export a player's match history as a file
+@BOT.command(name="export", help="Export a player's recent matches as csv, ndjson or parquet")
+async def export(ctx, summoner_name, count: int = 20, fmt="csv"):
+    """
+    Exports the most recent Teamfight Tactics (TFT) matches of a summoner as per-participant rows.
+    Args:
+        ctx (commands.Context): The context of the command invocation, used to interact with Discord.
+        summoner_name (str): The name of the summoner to export.
+        count (int): The number of recent matches, at most `MAX_EXPORT_MATCHES`.
+        fmt (str): The file format, one of csv, ndjson or parquet.
+    Behavior:
+        - Streams the matches to disk in chunks, stored matches are not fetched again.
+        - Uploads the file when done, split into parts if it exceeds the attachment limit of the server.
+    """
+    fmt = fmt.lower()
+    if fmt not in FORMATS or not 0 < count <= MAX_EXPORT_MATCHES:
+        await ctx.send(embed=discord.Embed(
+            title="Error",
+            description=f"Use `!export SUMMONER [1-{MAX_EXPORT_MATCHES}] [{'|'.join(FORMATS)}]`.",
+            color=discord.Color.red()
+        ))
+        return
+
+    loading_message: Message = await ctx.send("Exporting matches... Please wait.")
+
+    summoner_data = await RIOT_API.get_summoner_data(summoner_name)
+    puuid = summoner_data.get('puuid') if summoner_data else None
+    if not puuid:
+        embed = discord.Embed(
+            title="Error",
+            description=f"Could not find summoner **{summoner_name}**. Please check the name and try again.",
+            color=discord.Color.red()
+        )
+        await loading_message.edit(content="Error occurred.", embed=embed)
+        return
+
+    directory = tempfile.mkdtemp(prefix="tftbot-export-")
+    try:
+        max_bytes = ctx.guild.filesize_limit if ctx.guild else DEFAULT_MAX_BYTES
+        result = await export_history(RIOT_API, puuid, count, fmt, directory, safe_stem(summoner_name), max_bytes)
+        if not result.paths:
+            embed = discord.Embed(
+                title="Error",
+                description=f"Could not fetch match history for **{summoner_name}**.",
+                color=discord.Color.red()
+            )
+            await loading_message.edit(content="Error occurred.", embed=embed)
+            return
+
+        await loading_message.delete()
+        for part, path in enumerate(result.paths, start=1):
+            content = (f"Export of **{summoner_name}** ({result.matches} matches, {result.rows} rows)"
+                       + (f", part {part}/{len(result.paths)}" if len(result.paths) > 1 else ""))
+            await ctx.send(content=content, file=discord.File(path))
+    finally:
+        await asyncio.to_thread(shutil.rmtree, directory, True)
+
+
+# Command to bulk ingest high elo matches into the local match store
+@BOT.command(name="ingest", help="Ingest the recent matches of a ladder tier (challenger, grandmaster, master)")
+@commands.has_permissions(manage_guild=True)
+async def ingest(ctx, tier="challenger", matches_per_player: int = 20):
+    """
+    Ingests the recent matches of every player on an apex ladder into the local match store.
+    Args:
+        ctx (commands.Context): The context of the command invocation, used to interact with Discord.
+        tier (str): The apex tier to ingest, one of challenger, grandmaster or master.
+        matches_per_player (int): The number of recent matches to pull per player.
+    Behavior:
+        - Edits a status message with the ingestion progress while the ingestion runs.
+        - Resumes from the checkpoint of an interrupted ingestion of the same tier.
+        - Refuses to start while an ingestion of the same tier is running.
+    """
+    tier = tier.lower()
+    if tier not in ("challenger", "grandmaster", "master"):
+        await ctx.send(embed=discord.Embed(
+            title="Error",
+            description=f"Unknown tier **{tier}**. Use challenger, grandmaster or master.",
+            color=discord.Color.red()
+        ))
+        return
+    if tier in INGESTING:
+        await ctx.send(embed=discord.Embed(
+            title="Error",
+            description=f"An ingestion of **{tier}** is already running, wait for it to finish.",
+            color=discord.Color.red()
+        ))
+        return
+
+    INGESTING.add(tier)
+    try:
+        status_message: Message = await ctx.send(f"Ingesting **{tier}** matches... Please wait.")
+
+        async def on_progress(progress: IngestProgress):
+            await status_message.edit(content=f"Ingesting **{tier}** matches: "
+                                              f"players {progress.players_done}/{progress.players_total}, "
+                                              f"matches {progress.matches_done}/{progress.matches_total}")
+
+        ingestor = LadderIngestor(RIOT_API, MATCH_STORE, tiers=[tier], matches_per_player=matches_per_player,
+                                  checkpoint_path=f"ingest_checkpoint_{tier}.json", on_progress=on_progress)
+        progress = await ingestor.run()
+    finally:
+        INGESTING.discard(tier)
+    await status_message.edit(content=f"Ingested **{tier}**: {ingestor.matches_new} new matches, "
+                                      f"{progress.matches_total} distinct matches from {progress.players_total} players "
+                                      f"in {progress.elapsed:.0f}s.")
+
+    # Precompute the meta tables for the freshly ingested matches
+    if META_STATS is not None:
+        await asyncio.to_thread(META_STATS.refresh)
+
+
+# Command to show meta statistics over the ingested ladder matches
+@BOT.command(name="meta", help="Show average placement and top 4 rate per trait, combo, unit, item or comp")
+async def meta(ctx, kind="comps"):
+    """
+    Sends the meta statistics of the ingested ladder matches as paginated messages.
+    Args:
+        ctx (commands.Context): The context of the command invocation, used to interact with Discord.
+        kind (str): The table to show, one of traits, combos, units, items or comps.
+    Behavior:
+        - Serves the precomputed table, it is only recomputed if new matches were stored since.
+        - Sends an error embed for an unknown table kind, or while the stored matches are still being loaded.
+    """
+    if META_STATS is None:
+        await ctx.send(embed=discord.Embed(
+            title="Error",
+            description="The meta statistics are still loading, please try again in a moment.",
+            color=discord.Color.red()
+        ))
+        return
+
+    from meta_stats import KINDS, format_pages
+    kind = kind.lower()
+    if kind not in KINDS:
+        await ctx.send(embed=discord.Embed(
+            title="Error",
+            description=f"Unknown meta table **{kind}**. Use one of {', '.join(KINDS)}.",
+            color=discord.Color.red()
+        ))
+        return
+
+    rows = await asyncio.to_thread(META_STATS.table, kind)
+    await send_analysis_pages(ctx, format_pages(rows, kind), "Meta")
+
+
+# Command to control the profiling mode
+@BOT.command(name="profile", help="Profiling: on, off, dump (write the loop profile), memory (cached matches) or report (slow commands)")
+@commands.has_permissions(administrator=True)
+async def profile(ctx, action="report"):
+    """
+    Controls the profiling mode at runtime.
+    Args:
+        ctx (commands.Context): The context of the command invocation, used to interact with Discord.
+        action (str): "on" or "off" toggles profiling, "dump" writes the event loop profile collected so far,
+            "memory" shows the memory held by cached matches and "report" shows the slowest commands and loop callbacks.
+    """
+    action = action.lower()
+    if action == "on":
+        PROFILER.enable()
+        description = f"Profiling enabled, slow commands (> {PROFILER.slow_command:.1f}s) are written to `{PROFILER.directory}`."
+    elif action == "off":
+        paths = await asyncio.to_thread(PROFILER.dump) if PROFILER.disable() else []
+        description = "Profiling disabled." + "".join(f"\n`{path}`" for path in paths)
+    elif action == "dump":
+        paths = await asyncio.to_thread(PROFILER.dump)
+        description = "\n".join(f"`{path}`" for path in paths) or "Profiling is not enabled."
+    elif action == "memory":
+        report = RIOT_API.match_cache.memory_report()
+        description = (f"{report['matches']} cached matches, {report['bytes'] / 1024:.0f} KiB packed\n"
+                       f"{report['bytes_per_match']:.0f} bytes per match "
+                       f"(as JSON dictionaries: {report['unpacked_bytes_per_match']:.0f})\n"
+                       f"{report['identifiers']} identifiers interned ({report['interner_bytes'] / 1024:.0f} KiB)")
+    else:
+        description = PROFILER.report()
+    await ctx.send(embed=discord.Embed(title="Profiling", description=description, color=discord.Color.blue()))
+
+
+@BOT.before_invoke
+async def begin_command_trace(ctx: commands.Context):
+    """
+    Starts a stage trace of the invoked command while profiling is enabled.
+    """
+    args = ctx.message.content[len(ctx.prefix) + len(ctx.invoked_with):].strip()
+    ctx.trace = PROFILER.begin_command(ctx.command.qualified_name, args)
+
+
+@BOT.after_invoke
+async def end_command_trace(ctx: commands.Context):
+    """
+    Finishes the stage trace of the invoked command, slow commands are written to disk.
+    """
+    PROFILER.end_command(getattr(ctx, "trace", None))
+
+
+def start_background(coro) -> asyncio.Task:
+    """
+    Runs a coroutine as a task that is kept referenced until it finishes.
+    """
+    task = asyncio.create_task(coro)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    return task
+
+
+async def warmup() -> dict:
+    """
+    Prepares everything the first commands need, while the gateway connects.
+    Opens the Riot API connections, reads the match store index and loads the board sprites.
+
+    A failing step is logged and left out, the bot starts without it.
+
+    Returns:
+        dict: The seconds each finished step took, the number of stored matches if the store could be read
+            and the names of the failed steps under "failed_steps".
+    """
+    global BOARD_RENDERER
+
+    async def timed(coro):
+        started = time.perf_counter()
+        result = await coro
+        return result, round(time.perf_counter() - started, 3)
+
+    def create_renderer():
+        from board_render import BoardRenderer
+        renderer = BoardRenderer()
+        if not renderer.available:
+            logging.error("Board rendering requires Pillow, boards will not be shown.")
+        return renderer
+
+    results = await asyncio.gather(
+        timed(RIOT_API.warmup()),
+        timed(asyncio.to_thread(MATCH_STORE.count)),  # Counting reads the match ID index
+        timed(asyncio.to_thread(create_renderer) if BOARD_CHANNEL_ID else asyncio.sleep(0)),
+        return_exceptions=True,
+    )
+    steps = {"failed_steps": []}
+    for step, result in zip(WARMUP_STEPS, results):
+        if isinstance(result, Exception):
+            logging.error(f"Warmup step {step} failed", exc_info=result)
+            steps["failed_steps"].append(step)
+            continue
+        value, steps[step] = result
+        if step == "store_warmup":
+            steps["stored_matches"] = value
+        elif step == "board_warmup":
+            BOARD_RENDERER = value
+    return steps
+
+
+async def load_meta():
+    """
+    Loads the stored matches into the meta statistics, /meta and !meta are unavailable until then.
+    """
+    global META_STATS
+
+    def load():
+        from meta_stats import MetaStats
+        meta_stats = MetaStats()
+        meta_stats.load(MATCH_STORE)
+        meta_stats.refresh()
+        return meta_stats
+
+    META_STATS = await asyncio.to_thread(load)
+    if HTTP_API is not None:
+        HTTP_API.meta_stats = META_STATS
+    logging.info(f"Meta statistics loaded: {META_STATS.size} boards")
+
+
+async def setup_hook():
+    """
+    Starts the warmup and loads the stored matches into the meta statistics in the background, both run while the gateway connects.
+    Enables profiling right away if the bot was started with `--profile` and starts the HTTP API if configured.
+    """
+    global WARMUP
+    if PROFILE_ON_START:
+        PROFILER.enable()
+    if HTTP_API is not None:
+        await HTTP_API.start()
+    WARMUP = start_background(warmup())
+    start_background(load_meta())
+
+BOT.setup_hook = setup_hook
+
+BOT_CLOSE = BOT.close
+
+
+async def close():
+    """
+    Disconnects the bot, then stops the HTTP API, closes the Riot API connections and stops the render threads.
+    """
+    try:
+        await BOT_CLOSE()
+    finally:
+        if HTTP_API is not None:
+            await HTTP_API.stop()
+        if RIOT_API is not None:
+            await RIOT_API.close()
+        if BOARD_RENDERER is not None:
+            BOARD_RENDERER.close()
+
+BOT.close = close
 
 
-def run(riot_key, discord_token):
+@BOT.event
+async def on_ready():
+    """
+    Signals readiness once the gateway is connected and the warmup is done.
+    Logs the time to ready, writes the ready file and turns the HTTP API's /healthz healthy.
+    on_ready runs again after reconnects, readiness is only signaled once.
+    """
+    global READINESS
+    if READINESS is not None or WARMUP is None:
+        return
+    try:
+        steps = await WARMUP
+    except Exception:
+        logging.exception("Warmup failed, starting without it")
+        steps = {"failed_steps": list(WARMUP_STEPS)}
+    READINESS = {"time_to_ready": round(time.perf_counter() - STARTED, 3), **steps}
+    finished = [f"{label} {steps[step]:.2f}s" for step, label in WARMUP_STEPS.items() if step in steps]
+    if "stored_matches" in steps:
+        finished.append(f"{steps['stored_matches']} stored matches")
+    logging.info(f"Ready in {READINESS['time_to_ready']:.2f}s ({', '.join(finished) or 'no warmup'})"
+                 + (f", failed: {', '.join(steps['failed_steps'])}" if steps['failed_steps'] else ""))
+    if HTTP_API is not None:
+        HTTP_API.readiness = READINESS
+    if READY_FILE:
+        temporary = f"{READY_FILE}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"pid": os.getpid(), **READINESS}, f)
+        os.replace(temporary, READY_FILE)
+
+
+def run(riot_key, discord_token, store_path="matches.db", board_channel=None, profile=False, profile_dir="profiles", http_port=None, http_host="127.0.0.1",
+        ready_file=None, compress_store=False):
     """
     Initializes the Riot API with the provided key and starts the Discord bot.
     Args:
         riot_key (str): The API key for accessing Riot Games' API.
         discord_token (str): The token for authenticating the Discord bot.
+        store_path (str): Path of the local match store.
+        board_channel (int | None): ID of the channel rendered boards are uploaded to, None disables board rendering.
+        profile (bool): Enable the profiling mode from the start.
+        profile_dir (str): Where profiles and slow command traces are written.
+        http_port (int | None): Port of the read-only HTTP API, None disables it.
+        http_host (str): Interface the HTTP API listens on.
+        ready_file (str | None): Written once the bot is ready and removed when it stops.
+        compress_store (bool): Store new match bodies zstd compressed, see `MatchStore`.
     Raises:
         discord.HTTPException: If an HTTP error occurs while running the Discord bot.
             Specifically logs an error if the status code is 429 (Too Many Requests).
     """
-    global RIOT_API
-    RIOT_API = RiotAPI(riot_key)
+    global RIOT_API, MATCH_STORE, BOARD_CHANNEL_ID, PROFILE_ON_START, HTTP_API, READY_FILE
+    # Initialize logging, discord.py logs through the same root handler
+    logging.basicConfig(level=logging.INFO)
+    PROFILE_ON_START = profile
+    PROFILER.directory = profile_dir
+    MATCH_STORE = MatchStore(store_path, compress_store)
+    RIOT_API = RiotAPI(riot_key, store=MATCH_STORE, match_cache=MatchCache())
+    if http_port is not None:
+        from http_api import HTTPAPI
+        HTTP_API = HTTPAPI(RIOT_API, META_STATS, http_host, http_port)
+    if board_channel:
+        BOARD_CHANNEL_ID = board_channel  # The renderer is created by the warmup
+    READY_FILE = ready_file
+    if READY_FILE and os.path.exists(READY_FILE):
+        os.remove(READY_FILE)  # Left over by an instance that did not shut down cleanly
 
     try:
-        BOT.run(discord_token)
+        BOT.run(discord_token, log_handler=None)
     except discord.HTTPException as e:
         if e.status == 429:
             logging.error("The servers denied the connection due to too many requests.")
         else:
             raise e
+    finally:
+        MATCH_STORE.close()
+        if READY_FILE and os.path.exists(READY_FILE):
+            os.remove(READY_FILE)
+
+def load_config(args) -> tuple[str, str]:
+    """
+    Reads and validates the credentials, arguments take precedence over environment variables.
+    The environment variables may be set by an optional `envs.py` (a copy of `_envs.py`).
+
+    Returns:
+        tuple[str, str]: The Riot API key and the Discord token.
+    Raises:
+        ValueError: If a credential is missing or still a `FILL_ME` placeholder, or an argument is out of range.
+    """
+    try:
+        import envs
+        envs.set_envs()
+    except ImportError:
+        pass
+
+    riot_key = args.riot_api_key or os.getenv("RIOT_API_KEY")
+    discord_token = args.discord_token or os.getenv("DISCORD_TOKEN")
+    if not riot_key or not discord_token or "FILL_ME" in (riot_key, discord_token):
+        raise ValueError("Riot API Key and Discord Token must be provided either as arguments or environment variables.")
+    if args.http_port is not None and not 0 <= args.http_port <= 65535:
+        raise ValueError(f"Invalid HTTP API port {args.http_port}.")
+    return riot_key, discord_token
 
 def main():
     parser = argparse.ArgumentParser(description="TFT Bot")
     parser.add_argument("--riot-api-key", help="Riot API Key")
     parser.add_argument("--discord-token", help="Discord Bot Token")
+    parser.add_argument("--match-store", default="matches.db", help="Path of the local match store")
+    parser.add_argument("--compress-store", action="store_true", help="Store new match bodies zstd compressed with a trained dictionary")
+    parser.add_argument("--board-channel", type=int, help="ID of the channel rendered boards are uploaded to, enables board images")
+    parser.add_argument("--profile", action="store_true", help="Enable the profiling mode (loop sampling and slow command traces)")
+    parser.add_argument("--profile-dir", default="profiles", help="Where profiles and slow command traces are written")
+    parser.add_argument("--http-port", type=int, help="Serve the read-only HTTP API on this port")
+    parser.add_argument("--http-host", default="127.0.0.1", help="Interface the HTTP API listens on")
+    parser.add_argument("--ready-file", help="Written once the bot is ready (with the time to ready) and removed when it stops")
     args = parser.parse_args()
 
-    envs.set_envs()
-
-    RIOT_API_KEY = args.riot_api_key or os.getenv("RIOT_API_KEY")
-    DISCORD_TOKEN = args.discord_token or os.getenv("DISCORD_TOKEN")
-
-    # Initialize logging
-    logging.basicConfig(level=logging.INFO)
-
-    if not RIOT_API_KEY or not DISCORD_TOKEN:
-        raise ValueError("Riot API Key and Discord Token must be provided either as arguments or environment variables.")
+    RIOT_API_KEY, DISCORD_TOKEN = load_config(args)
 
-    run(RIOT_API_KEY, DISCORD_TOKEN)
+    run(RIOT_API_KEY, DISCORD_TOKEN, args.match_store, args.board_channel, args.profile, args.profile_dir,
+        args.http_port, args.http_host, args.ready_file, args.compress_store)
 
 # Run the bot
 if __name__ == "__main__":
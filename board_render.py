@@ -0,0 +1,211 @@
+import os
+import io
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import discord
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow is optional, without it no boards are rendered
+    Image = None
+
+# Bump when the drawing changes so stale images on disk are not reused
+RENDER_VERSION = 1
+
+TILE = 72
+PADDING = 8
+TRAIT_WIDTH = 180
+STAR = {1: "*", 2: "**", 3: "***", 4: "****"}
+
+# Discord attachment URLs are signed and expire after roughly a day
+URL_TTL = 12 * 60 * 60
+
+
+def board_key(match_id, puuid) -> str:
+    """
+    Returns the content address of a rendered board.
+    """
+    return hashlib.sha256(f"{RENDER_VERSION}:{match_id}:{puuid}".encode()).hexdigest()
+
+
+def name_color(name: str) -> tuple[int, int, int]:
+    digest = hashlib.md5(name.encode()).digest()
+    return 60 + digest[0] % 140, 60 + digest[1] % 140, 60 + digest[2] % 140
+
+
+class BoardRenderer():
+    """
+    Renders participant boards (units with star levels and items, active traits) to PNG images.
+
+    Unit sprites are loaded once from `assets_dir/units/<character_id>.png` and shared by the
+    render threads, units without a sprite are drawn as coloured tiles. Finished images are
+    content-addressed by (match, participant) and cached in `cache_dir`, and the URL a board was
+    uploaded to is remembered so it can be shown again without rendering or uploading.
+
+    Args:
+        assets_dir (str): Directory holding the sprite assets.
+        cache_dir (str): Directory of the rendered image cache.
+        workers (int): Number of render threads.
+        max_urls (int): Number of uploaded attachment URLs to remember.
+    """
+
+    def __init__(self, assets_dir="assets", cache_dir="board_cache", workers=2, max_urls=5000):
+        self.assets_dir = assets_dir
+        self.cache_dir = cache_dir
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="board-render")
+        self.max_urls = max_urls
+        self.urls: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.in_flight: dict[str, asyncio.Future] = {}
+        self.uploads: dict[str, asyncio.Task] = {}
+        self.sprites = self.load_sprites() if self.available else {}
+        self.font = ImageFont.load_default() if self.available else None
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def load_sprites(self) -> dict:
+        sprites = {}
+        units_dir = os.path.join(self.assets_dir, "units")
+        if not os.path.isdir(units_dir):
+            return sprites
+        for file_name in os.listdir(units_dir):
+            name, ext = os.path.splitext(file_name)
+            if ext.lower() != ".png":
+                continue
+            with Image.open(os.path.join(units_dir, file_name)) as sprite:
+                sprites[name.lower()] = sprite.convert("RGBA").resize((TILE, TILE))
+        logging.info(f"Loaded {len(sprites)} unit sprites")
+        return sprites
+
+    def path(self, key) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def draw(self, board: dict) -> bytes:
+        """
+        Draws a board, see `match_store.participant_rows` for its format.
+
+        Returns:
+            bytes: The PNG encoded image.
+        """
+        units = board.get('units', [])
+        traits = sorted(board.get('traits', []), key=lambda trait: (-trait[1], trait[0]))
+        width = PADDING + max(len(units), 1) * (TILE + PADDING) + TRAIT_WIDTH
+        height = max(PADDING * 2 + 20 + TILE + 40, PADDING * 2 + 20 + len(traits) * 16)
+        image = Image.new("RGBA", (width, height), (30, 31, 34, 255))
+        draw = ImageDraw.Draw(image)
+        draw.text((PADDING, PADDING), f"{board.get('name', 'Unknown Player')} - #{board.get('placement', '?')} "
+                                      f"- Level {board.get('level', '?')}", fill=(255, 255, 255), font=self.font)
+
+        top = PADDING + 20
+        for i, (character_id, tier, items) in enumerate(units):
+            left = PADDING + i * (TILE + PADDING)
+            sprite = self.sprites.get(character_id.lower())
+            if sprite is not None:
+                image.alpha_composite(sprite, (left, top))
+            else:
+                draw.rectangle((left, top, left + TILE, top + TILE), fill=name_color(character_id))
+                draw.text((left + 4, top + TILE // 2 - 6), character_id[:11], fill=(255, 255, 255), font=self.font)
+            draw.text((left + 4, top + 4), STAR.get(tier, str(tier)), fill=(255, 215, 0), font=self.font)
+            for j, item in enumerate(items[:3]):
+                draw.rectangle((left + j * 24, top + TILE + 4, left + j * 24 + 20, top + TILE + 24), fill=name_color(item))
+                draw.text((left + j * 24 + 2, top + TILE + 8), item[:3], fill=(255, 255, 255), font=self.font)
+
+        left = width - TRAIT_WIDTH + PADDING
+        for i, (name, tier, num_units) in enumerate(traits):
+            draw.text((left, top + i * 16), f"{num_units} {name} (Tier {tier})", fill=(200, 200, 200), font=self.font)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue()
+
+    def render_to_disk(self, key, board: dict) -> str:
+        path = self.path(key)
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.draw(board))
+        os.replace(tmp_path, path)
+        return path
+
+    async def render(self, match_id, board: dict) -> str:
+        """
+        Renders a board in the render pool unless it is already cached on disk.
+
+        Args:
+            match_id (str): The match the board belongs to.
+            board (dict): The participant row of the board.
+
+        Returns:
+            str: Path of the PNG image.
+        """
+        key = board_key(match_id, board['puuid'])
+        future = self.in_flight.get(key)
+        if future is None:  # Concurrent requests for the same board share one render
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self.render_to_disk, key, board)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def get_url(self, key) -> str | None:
+        entry = self.urls.get(key)
+        if entry is None:
+            return None
+        url, uploaded = entry
+        if time.time() - uploaded > URL_TTL:
+            del self.urls[key]
+            return None
+        self.urls.move_to_end(key)
+        return url
+
+    def remember_url(self, key, url):
+        self.urls[key] = (url, time.time())
+        self.urls.move_to_end(key)
+        while len(self.urls) > self.max_urls:
+            self.urls.popitem(last=False)
+
+    async def image_url(self, match_id, board: dict, channel) -> str | None:
+        """
+        Returns an attachment URL showing the board, rendering and uploading it only if needed.
+
+        Args:
+            match_id (str): The match the board belongs to.
+            board (dict): The participant row of the board.
+            channel (discord.abc.Messageable): Channel the rendered image is uploaded to.
+
+        Returns:
+            str | None: The attachment URL or None if the board could not be rendered.
+        """
+        if not self.available:
+            return None
+        key = board_key(match_id, board['puuid'])
+        url = self.get_url(key)
+        if url is not None:
+            return url
+        task = self.uploads.get(key)
+        if task is None:  # Concurrent requests for the same board share one upload
+            task = asyncio.ensure_future(self.upload(key, match_id, board, channel))
+            self.uploads[key] = task
+            task.add_done_callback(lambda _: self.uploads.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def upload(self, key, match_id, board: dict, channel) -> str | None:
+        try:
+            path = await self.render(match_id, board)
+            message = await channel.send(file=discord.File(path, filename=f"{key}.png"))
+        except (OSError, discord.HTTPException) as e:
+            logging.error(f"Could not render board {key}: {e}")
+            return None
+        url = message.attachments[0].url
+        self.remember_url(key, url)
+        return url
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import threading
+from array import array
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, raw blobs fall back to zlib
+    zstandard = None
+
+
+class Interner():
+    """
+    Maps strings to small integer IDs and back, each distinct string is held once.
+
+    Args:
+        max_id (int | None): Largest allowed ID, e.g. 65535 for IDs packed into unsigned shorts.
+    """
+
+    def __init__(self, max_id=None):
+        self.max_id = max_id
+        self.ids: dict[str, int] = {}
+        self.strings: list[str] = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, string: str) -> int:
+        index = self.ids.get(string)
+        if index is None:
+            with self.lock:
+                index = self.ids.get(string)
+                if index is None:
+                    index = len(self.strings)
+                    if self.max_id is not None and index > self.max_id:
+                        raise OverflowError(f"More than {self.max_id + 1} interned strings")
+                    self.strings.append(sys.intern(string))
+                    self.ids[string] = index
+        return index
+
+    def lookup(self, index: int) -> str:
+        return self.strings[index]
+
+
+# Trait, unit and item identifiers: a few hundred per set, packed as unsigned shorts
+# puuids and player names are not interned here, there is no bound on how many distinct players the bot sees.
+# They are `sys.intern`ed instead, which shares them between cached matches but frees them with the last one.
+IDENTIFIERS = Interner(max_id=0xFFFF)
+
+PLAYER_FIELDS = 5  # placement, level, damage, number of traits, number of units
+
+
+class CompactMatch():
+    """
+    A match reduced to the fields the bot reads, with identifiers interned and participants packed into arrays.
+
+    `to_match_data` rebuilds a match dictionary in the Riot API layout holding exactly those
+    fields, so `format_analysis` and `participant_rows` work on it unchanged.
+
+    Layout:
+        puuids, names: One string per participant.
+        players: PLAYER_FIELDS ints per participant.
+        traits: (name, tier_current, tier_total, num_units) per trait, in participant order.
+        units: (character_id, tier, number of items, item...) per unit, in participant order.
+    """
+    __slots__ = ("match_id", "game_datetime", "puuids", "names", "players", "traits", "units")
+
+    def __init__(self, match_id, game_datetime, puuids: tuple, names: tuple, players: array, traits: array, units: array):
+        self.match_id = match_id
+        self.game_datetime = game_datetime
+        self.puuids = puuids
+        self.names = names
+        self.players = players
+        self.traits = traits
+        self.units = units
+
+    @classmethod
+    def pack(cls, match_data: dict) -> "CompactMatch":
+        puuids, names = [], []
+        players, traits, units = array("i"), array("H"), array("H")
+        info = match_data.get('info', {})
+        for participant in info.get('participants', []):
+            participant_traits = participant.get('traits', [])
+            participant_units = participant.get('units', [])
+            puuids.append(sys.intern(participant.get('puuid', '')))
+            names.append(sys.intern(participant.get('riotIdGameName', 'Unknown Player')))
+            players.extend((participant.get('placement') or 0, participant.get('level') or 0,
+                            participant.get('total_damage_to_players', 0),
+                            len(participant_traits), len(participant_units)))
+            for trait in participant_traits:
+                traits.extend((IDENTIFIERS.intern(trait['name']), trait.get('tier_current', 0),
+                               trait.get('tier_total', 0), trait.get('num_units', 0)))
+            for unit in participant_units:
+                items = unit.get('itemNames', [])
+                units.extend((IDENTIFIERS.intern(unit['character_id']), unit.get('tier', 1), len(items)))
+                units.extend(IDENTIFIERS.intern(item) for item in items)
+        return cls(sys.intern(match_data.get('metadata', {}).get('match_id', '')), info.get('game_datetime'),
+                   tuple(puuids), tuple(names), players, traits, units)
+
+    def to_match_data(self) -> dict:
+        participants = []
+        trait_index = unit_index = 0
+        for player, (puuid, name) in enumerate(zip(self.puuids, self.names)):
+            placement, level, damage, trait_count, unit_count = self.players[player * PLAYER_FIELDS:(player + 1) * PLAYER_FIELDS]
+            traits = []
+            for _ in range(trait_count):
+                trait_name, tier_current, tier_total, num_units = self.traits[trait_index:trait_index + 4]
+                traits.append({"name": IDENTIFIERS.lookup(trait_name), "tier_current": tier_current,
+                               "tier_total": tier_total, "num_units": num_units})
+                trait_index += 4
+            units = []
+            for _ in range(unit_count):
+                character_id, tier, item_count = self.units[unit_index:unit_index + 3]
+                items = [IDENTIFIERS.lookup(item) for item in self.units[unit_index + 3:unit_index + 3 + item_count]]
+                units.append({"character_id": IDENTIFIERS.lookup(character_id), "tier": tier, "itemNames": items})
+                unit_index += 3 + item_count
+            participants.append({"puuid": puuid, "riotIdGameName": name,
+                                 "placement": placement or None, "level": level or None,
+                                 "total_damage_to_players": damage, "traits": traits, "units": units})
+        return {"metadata": {"match_id": self.match_id},
+                "info": {"game_datetime": self.game_datetime, "participants": participants}}
+
+
+class BlobCodec():
+    """
+    Compresses raw match JSON, with zstd and an optional trained dictionary, or zlib without zstandard.
+
+    Match bodies share most of their keys and identifiers, so a dictionary trained on a few
+    hundred samples compresses single matches far better than zstd alone.
+
+    Args:
+        dictionary (bytes | None): A dictionary from `train`, ignored without zstandard.
+        level (int): The compression level.
+    """
+
+    def __init__(self, dictionary: bytes = None, level=3):
+        self.dictionary = dictionary
+        self.level = level
+        if zstandard is not None:
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self.compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+            self.decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+
+    @staticmethod
+    def train(samples: list[bytes], size=64 * 1024) -> bytes | None:
+        """
+        Trains a zstd dictionary on raw match bodies, None without zstandard.
+        """
+        if zstandard is None:
+            return None
+        return zstandard.train_dictionary(size, samples).as_bytes()
+
+    def compress(self, raw: bytes) -> bytes:
+        if zstandard is None:
+            return zlib.compress(raw, self.level)
+        return self.compressor.compress(raw)
+
+    def decompress(self, blob: bytes) -> bytes:
+        if zstandard is None:
+            return zlib.decompress(blob)
+        return self.decompressor.decompress(blob)
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    """
+    Returns the memory held by an object and everything it references, each object counted once.
+
+    Pass the same `seen` set to measure several objects, objects they share are only counted for the first.
+    """
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class MatchCache():
+    """
+    A bounded LRU cache of matches held as `CompactMatch`es.
+
+    `get` returns the reduced layout of `CompactMatch.to_match_data`, not the full Riot JSON.
+
+    Args:
+        maxsize (int): The number of matches to keep.
+        measure_every (int): Measure the decoded size of every n-th added match for `memory_report`,
+            measuring takes longer than packing.
+    """
+
+    def __init__(self, maxsize=1024, measure_every=16):
+        self.maxsize = maxsize
+        self.measure_every = measure_every
+        self.matches: OrderedDict[str, CompactMatch] = OrderedDict()
+        self.added = 0
+        self.unpacked_bytes = 0  # Summed size of the measured matches as decoded JSON dictionaries
+        self.unpacked_count = 0
+
+    def __len__(self):
+        return len(self.matches)
+
+    def __contains__(self, match_id):
+        return match_id in self.matches
+
+    def get(self, match_id) -> dict | None:
+        compact = self.matches.get(match_id)
+        if compact is None:
+            return None
+        self.matches.move_to_end(match_id)
+        return compact.to_match_data()
+
+    def put(self, match_data: dict):
+        match_id = match_data.get('metadata', {}).get('match_id')
+        if not match_id or match_id in self.matches:
+            return
+        self.matches[match_id] = CompactMatch.pack(match_data)
+        if self.added % self.measure_every == 0:
+            self.unpacked_bytes += deep_sizeof(match_data)
+            self.unpacked_count += 1
+        self.added += 1
+        while len(self.matches) > self.maxsize:
+            self.matches.popitem(last=False)
+
+    def memory_report(self) -> dict:
+        """
+        Reports the memory held by the cached matches.
+
+        Returns:
+            dict: 'matches', 'bytes' (packed matches, strings shared between them counted once), 'bytes_per_match',
+                'unpacked_bytes_per_match' (the average measured match as a JSON dictionary) and the size of the identifier interner.
+        """
+        count = len(self.matches)
+        seen = set()
+        packed = sum(deep_sizeof(compact, seen) for compact in self.matches.values())
+        return {
+            "matches": count,
+            "bytes": packed,
+            "bytes_per_match": packed / count if count else 0,
+            "unpacked_bytes_per_match": self.unpacked_bytes / self.unpacked_count if self.unpacked_count else 0,
+            "interner_bytes": deep_sizeof(IDENTIFIERS.strings) + deep_sizeof(IDENTIFIERS.ids),
+            "identifiers": len(IDENTIFIERS),
+        }
+
+
+def load_fixtures(directory) -> list[bytes]:
+    """
+    Reads every *.json match body in a directory.
+    """
+    fixtures = []
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(directory, file_name), "rb") as f:
+                fixtures.append(f.read())
+    return fixtures
+
+
+def benchmark(fixtures: list[bytes]) -> dict:
+    """
+    Compares the memory per match of decoded JSON, packed matches and compressed raw blobs.
+
+    Args:
+        fixtures (list[bytes]): Raw match bodies.
+
+    Returns:
+        dict: Average bytes per match and encode/decode times per match in microseconds.
+    """
+    count = len(fixtures)
+    matches = [json.loads(raw) for raw in fixtures]
+    report = {"matches": count, "raw_json": sum(map(len, fixtures)) / count,
+              "decoded": sum(deep_sizeof(match_data) for match_data in matches) / count}
+
+    started = time.perf_counter()
+    packed = [CompactMatch.pack(match_data) for match_data in matches]
+    report["pack_us"] = (time.perf_counter() - started) / count * 1e6
+    seen = set()
+    report["packed"] = sum(deep_sizeof(compact, seen) for compact in packed) / count
+    started = time.perf_counter()
+    for compact in packed:
+        compact.to_match_data()
+    report["unpack_us"] = (time.perf_counter() - started) / count * 1e6
+
+    report["zlib"] = sum(len(zlib.compress(raw)) for raw in fixtures) / count
+    if zstandard is not None:
+        plain = BlobCodec()
+        report["zstd"] = sum(len(plain.compress(raw)) for raw in fixtures) / count
+        training, measured = fixtures[:count // 2], fixtures[count // 2:]
+        codec = BlobCodec(BlobCodec.train(training))
+        blobs = [codec.compress(raw) for raw in measured]
+        report["zstd_dictionary"] = sum(map(len, blobs)) / len(blobs)
+        started = time.perf_counter()
+        for blob in blobs:
+            codec.decompress(blob)
+        report["zstd_dictionary_decompress_us"] = (time.perf_counter() - started) / len(blobs) * 1e6
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact match representation")
+    parser.add_argument("fixtures", nargs="?", help="Directory of recorded match JSON files, generated matches if omitted")
+    parser.add_argument("--matches", type=int, default=500, help="Number of generated matches without fixtures")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        from fake_riot import FakeRiotServer
+        server = FakeRiotServer(players_per_tier=100, matches=args.matches)
+        fixtures = [json.dumps(match_data).encode("utf-8") for match_data in server.matches.values()]
+
+    for key, value in benchmark(fixtures).items():
+        print(f"{key:32} {value:12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from fake_riot import FakeRiotServer
+from riot_api import RiotAPI
+
+
+@pytest.fixture
+def fake_riot():
+    """
+    Returns an async context manager that starts a fake Riot server and yields a RiotAPI pointed at it.
+
+    The RiotAPI is closed and the server stopped on exit, keyword arguments are passed to the RiotAPI.
+    """
+    @asynccontextmanager
+    async def connect(server: FakeRiotServer, **kwargs):
+        url = await server.start()
+        riot_api = RiotAPI("fake-key", base_url=url, **kwargs)
+        try:
+            yield riot_api
+        finally:
+            await riot_api.close()
+            await server.stop()
+
+    return connect
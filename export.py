@@ -0,0 +1,316 @@
+import os
+import io
+import csv
+import json
+import asyncio
+import logging
+import argparse
+import importlib.util
+from typing import NamedTuple
+from contextlib import aclosing
+
+# pyarrow is optional, without it parquet exports are unavailable
+# It takes longer to import than the rest of the bot, so it is only imported by the first parquet export
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+from riot_api import RiotAPI
+from match_store import MatchStore, participant_rows
+
+FORMATS = ("csv", "ndjson", "parquet")
+COLUMNS = ["match_id", "game_datetime", "puuid", "name", "placement", "level", "damage", "traits", "units"]
+
+# Discord's attachment limit for servers without boosts
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+
+class ExportResult(NamedTuple):
+    """
+    The outcome of an export.
+
+    Attributes:
+        paths (list[str]): The paths of the written parts, empty if there were no matches.
+        matches (int): The number of exported matches, lower than requested if some could not be fetched.
+        rows (int): The number of exported rows, one per participant.
+    """
+    paths: list[str]
+    matches: int
+    rows: int
+
+
+async def iter_match_ids(riot_api: RiotAPI, puuid, count, page_size=100):
+    """
+    Yields the IDs of a player's most recent matches, newest first, paging through the match history.
+    """
+    start = 0
+    while start < count:
+        match_ids = await riot_api.get_tft_match_history(puuid, count=min(page_size, count - start), start=start)
+        if not match_ids:
+            return
+        for match_id in match_ids:
+            yield match_id
+        start += len(match_ids)
+
+
+async def iter_matches(riot_api: RiotAPI, puuid, count, prefetch=4):
+    """
+    Yields a player's most recent matches in order, fetching up to `prefetch` matches concurrently.
+
+    At most `prefetch` matches are held in memory at a time. Stored matches come from the match store.
+    Fetches still in flight are cancelled when the consumer stops early or raises.
+    """
+    window = []
+    try:
+        async for match_id in iter_match_ids(riot_api, puuid, count):
+            window.append(asyncio.ensure_future(riot_api.get_tft_match_summary(match_id)))
+            if len(window) >= prefetch:
+                match_data = await window.pop(0)
+                if match_data and 'info' in match_data:
+                    yield match_data
+        while window:
+            match_data = await window.pop(0)
+            if match_data and 'info' in match_data:
+                yield match_data
+    finally:
+        for future in window:
+            future.cancel()
+        await asyncio.gather(*window, return_exceptions=True)
+
+
+def flatten(match_data: dict) -> list[dict]:
+    """
+    Flattens a match into export rows, one per participant, with traits and units as JSON strings.
+    """
+    rows = participant_rows(match_data)
+    for row in rows:
+        row['traits'] = json.dumps(row['traits'])
+        row['units'] = json.dumps(row['units'])
+    return rows
+
+
+async def iter_chunks(matches, chunk_size=500):
+    """
+    Groups the rows of a match stream into lists of about `chunk_size` rows.
+    """
+    chunk = []
+    async for match_data in matches:
+        chunk.extend(flatten(match_data))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ChunkedWriter():
+    """
+    Writes row chunks to `<directory>/<stem>.partN.<ext>` files, starting a new part before one exceeds `max_bytes`.
+
+    Args:
+        directory (str): The output directory.
+        stem (str): The file name without part number and extension.
+        max_bytes (int): The maximum size of a part.
+    """
+    extension = ""
+
+    def __init__(self, directory, stem, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.stem = stem
+        self.max_bytes = max_bytes
+        self.paths: list[str] = []
+        self.file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def next_path(self) -> str:
+        path = os.path.join(self.directory, f"{self.stem}.part{len(self.paths) + 1}.{self.extension}")
+        self.paths.append(path)
+        return path
+
+    def open_part(self):
+        self.close_part()
+        self.file = open(self.next_path(), "wb")
+        self.file.write(self.header().encode("utf-8"))
+
+    def close_part(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def header(self) -> str:
+        return ""
+
+    def encode(self, row: dict) -> str:
+        raise NotImplementedError
+
+    def write(self, chunk: list[dict]):
+        header_size = len(self.header().encode("utf-8"))
+        for row in chunk:
+            line = self.encode(row).encode("utf-8")
+            # Every part holds at least one row, even if that row alone exceeds max_bytes
+            if self.file is None or (self.file.tell() + len(line) > self.max_bytes and self.file.tell() > header_size):
+                self.open_part()
+            self.file.write(line)
+
+    def close(self) -> list[str]:
+        """
+        Finishes the last part.
+
+        Returns:
+            list[str]: The paths of all written parts.
+        """
+        self.close_part()
+        return self.paths
+
+
+class CSVWriter(ChunkedWriter):
+    extension = "csv"
+
+    def header(self) -> str:
+        return ",".join(COLUMNS) + "\r\n"
+
+    def encode(self, row: dict) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow([row[column] for column in COLUMNS])
+        return buffer.getvalue()
+
+
+class NDJSONWriter(ChunkedWriter):
+    extension = "ndjson"
+
+    def encode(self, row: dict) -> str:
+        return json.dumps({column: row[column] for column in COLUMNS}) + "\n"
+
+
+class ParquetWriter(ChunkedWriter):
+    """
+    Writes every chunk as one row group, a new part is started before a part would exceed `max_bytes`.
+
+    Each row group is first written to a buffer as a parquet file of its own. That size includes its own
+    footer, so the sizes of a part's row groups add up to an upper bound of the part's size. Chunks that
+    alone exceed `max_bytes` are split into smaller row groups.
+    """
+    extension = "parquet"
+
+    def __init__(self, directory, stem, max_bytes=DEFAULT_MAX_BYTES):
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("Parquet exports require pyarrow")
+        import pyarrow
+        super().__init__(directory, stem, max_bytes)
+        self.schema = pyarrow.schema([
+            ("match_id", pyarrow.string()), ("game_datetime", pyarrow.int64()), ("puuid", pyarrow.string()),
+            ("name", pyarrow.string()), ("placement", pyarrow.int8()), ("level", pyarrow.int8()),
+            ("damage", pyarrow.int32()), ("traits", pyarrow.string()), ("units", pyarrow.string()),
+        ])
+        self.size = 0
+
+    def open_part(self):
+        import pyarrow.parquet
+        self.close_part()
+        self.file = pyarrow.parquet.ParquetWriter(self.next_path(), self.schema, compression="zstd")
+        self.size = 0
+
+    def measure(self, table) -> int:
+        import pyarrow
+        import pyarrow.parquet
+        buffer = pyarrow.BufferOutputStream()
+        pyarrow.parquet.write_table(table, buffer, compression="zstd")
+        return buffer.getvalue().size
+
+    def write_table(self, table):
+        size = self.measure(table)
+        if size > self.max_bytes and table.num_rows > 1:
+            half = table.num_rows // 2
+            self.write_table(table.slice(0, half))
+            self.write_table(table.slice(half))
+            return
+        # Every part holds at least one row group, even if a single row exceeds max_bytes
+        if self.file is None or self.size + size > self.max_bytes:
+            self.open_part()
+        self.file.write_table(table)
+        self.size += size
+
+    def write(self, chunk: list[dict]):
+        import pyarrow
+        self.write_table(pyarrow.Table.from_pylist(chunk, schema=self.schema))
+
+
+WRITERS = {"csv": CSVWriter, "ndjson": NDJSONWriter, "parquet": ParquetWriter}
+
+
+async def export_history(riot_api: RiotAPI, puuid, count, fmt, directory, stem, max_bytes=DEFAULT_MAX_BYTES, chunk_size=500) -> ExportResult:
+    """
+    Streams a player's most recent matches into per-participant rows on disk.
+
+    The pipeline is fetch -> parse -> flatten -> write chunked output. Memory stays constant in
+    `count`: only a few matches and one chunk of rows are held at a time, and the writes run in a worker thread.
+
+    Args:
+        riot_api (RiotAPI): The API client, stored matches are read from its match store.
+        puuid (str): The player to export.
+        count (int): The number of recent matches to export.
+        fmt (str): One of "csv", "ndjson" or "parquet".
+        directory (str): The output directory.
+        stem (str): The file name without part number and extension.
+        max_bytes (int): The maximum size of a part, larger exports are split.
+        chunk_size (int): The number of rows written at once.
+
+    Returns:
+        ExportResult: The written parts and the number of exported matches and rows.
+    """
+    writer = WRITERS[fmt](directory, stem, max_bytes)
+    matches = rows = 0
+    try:
+        # Closing the match stream when a write fails cancels its prefetched fetches
+        async with aclosing(iter_matches(riot_api, puuid, count)) as match_stream:
+            async for chunk in iter_chunks(match_stream, chunk_size):
+                await asyncio.to_thread(writer.write, chunk)
+                matches += len({row['match_id'] for row in chunk})  # A match never spans two chunks
+                rows += len(chunk)
+    finally:
+        paths = await asyncio.to_thread(writer.close)
+    return ExportResult(paths, matches, rows)
+
+
+def safe_stem(summoner_name) -> str:
+    return "".join(char if char.isalnum() or char in "-_" else "_" for char in summoner_name)
+
+
+async def export(riot_key, summoner_name, count, fmt, directory, store_path=None, base_url=None, max_bytes=DEFAULT_MAX_BYTES):
+    store = MatchStore(store_path) if store_path else None
+    riot_api = RiotAPI(riot_key, base_url=base_url, store=store)
+    try:
+        summoner_data = await riot_api.get_summoner_data(summoner_name)
+        if not summoner_data or not summoner_data.get('puuid'):
+            raise ValueError(f"Could not find summoner {summoner_name}")
+        result = await export_history(riot_api, summoner_data['puuid'], count, fmt, directory, safe_stem(summoner_name), max_bytes)
+        for path in result.paths:
+            logging.info(f"Wrote {path}")
+        logging.info(f"Exported {result.matches} matches ({result.rows} rows)")
+        return result.paths
+    finally:
+        await riot_api.close()
+        if store is not None:
+            store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a player's TFT match history")
+    parser.add_argument("summoner", help="Riot ID of the player, e.g. Name/Tag")
+    parser.add_argument("--count", type=int, default=20, help="Number of recent matches")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Output format")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="Split the output into parts of at most this size")
+    parser.add_argument("--riot-api-key", help="Riot API Key")
+    parser.add_argument("--store", default="matches.db", help="Path of the match store to reuse, empty to disable")
+    parser.add_argument("--base-url", help="Override the Riot API host, e.g. a local fake server")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    riot_key = args.riot_api_key or os.getenv("RIOT_API_KEY")
+    if not riot_key:
+        raise ValueError("Riot API Key must be provided either as argument or environment variable.")
+
+    asyncio.run(export(riot_key, args.summoner, args.count, args.format, args.out, args.store or None, args.base_url, args.max_bytes))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import random
+import logging
+import argparse
+from collections import Counter
+
+from aiohttp import web
+
+UNITS = ["Vi", "Jinx", "Ekko", "Silco", "Jayce", "Caitlyn", "Heimerdinger", "Mel", "Ambessa", "Warwick",
+         "Sevika", "Smeech", "Loris", "Renni", "Twitch", "Zeri", "Maddie", "Corki", "Elise", "Rell",
+         "Akali", "Blitzcrank", "Camille", "Ezreal", "Garen", "Leona", "Lux", "Morgana", "Nocturne", "Sett"]
+TRAITS = {
+    "Enforcer": ["Vi", "Caitlyn", "Loris", "Maddie", "Camille"],
+    "Rebel": ["Jinx", "Ekko", "Zeri", "Akali", "Ezreal"],
+    "Chembaron": ["Silco", "Smeech", "Renni", "Sevika", "Twitch"],
+    "Academy": ["Jayce", "Heimerdinger", "Lux", "Leona", "Ezreal"],
+    "Conqueror": ["Mel", "Ambessa", "Garen", "Sett", "Rell"],
+    "Experiment": ["Warwick", "Elise", "Blitzcrank", "Nocturne", "Morgana"],
+    "Sniper": ["Caitlyn", "Twitch", "Maddie", "Corki", "Zeri"],
+    "Bruiser": ["Vi", "Sevika", "Warwick", "Sett", "Blitzcrank"],
+}
+ITEMS = ["InfinityEdge", "GuinsoosRageblade", "BlueBuff", "Bloodthirster", "WarmogsArmor", "DragonsClaw",
+         "GiantSlayer", "Redemption", "JeweledGauntlet", "TitansResolve"]
+
+
+class FakeRiotServer():
+    """
+    A local stand-in for the Riot API serving deterministic generated data.
+
+    Every tier ladder holds `players_per_tier` players, and each match is played by 8 of them so
+    match IDs overlap between players just like on the real ladder. Point `RiotAPI(base_url=...)`
+    at `url` after `start()`.
+
+    Args:
+        players_per_tier (int): Ladder size of each apex tier.
+        matches (int): Number of distinct matches to generate.
+        seed (int): Seed of the data generator.
+        tiers (tuple[str]): The apex tiers to serve.
+    """
+
+    def __init__(self, players_per_tier=10, matches=40, seed=0, tiers=("challenger", "grandmaster")):
+        rnd = random.Random(seed)
+        self.requests = Counter()
+        self.players = {}
+        self.ladders = {}
+        for tier in tiers:
+            self.ladders[tier] = []
+            for i in range(players_per_tier):
+                puuid = f"puuid-{tier}-{i}"
+                self.players[puuid] = {"puuid": puuid, "gameName": f"{tier.title()}{i}", "tagLine": "NA1"}
+                self.ladders[tier].append(puuid)
+        self.history = {puuid: [] for puuid in self.players}
+        self.matches = {}
+        self.active_games = {}
+        puuids = sorted(self.players)
+        for i in range(matches):
+            match_id = f"NA1_{5000000000 + i}"
+            lobby = rnd.sample(puuids, min(8, len(puuids)))
+            self.matches[match_id] = self.generate_match(rnd, match_id, lobby, 1700000000000 + i * 1800000)
+            for puuid in lobby:
+                self.history[puuid].insert(0, match_id)
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/riot/account/v1/accounts/by-riot-id/{name}/{tag}", self.account),
+            web.get("/tft/league/v1/{tier}", self.league),
+            web.get("/tft/match/v1/matches/by-puuid/{puuid}/ids", self.match_ids),
+            web.get("/tft/match/v1/matches/{match_id}", self.match),
+            web.get("/lol/spectator/tft/v5/active-games/by-puuid/{puuid}", self.active_game),
+        ])
+        self.runner: web.AppRunner = None
+        self.url: str = None
+
+    def generate_match(self, rnd, match_id, lobby, game_datetime) -> dict:
+        participants = []
+        for placement, puuid in enumerate(lobby, start=1):
+            board = rnd.sample(UNITS, rnd.randint(6, 9))
+            traits = []
+            for name, members in TRAITS.items():
+                num_units = sum(unit in members for unit in board)
+                if num_units:
+                    traits.append({"name": f"TFT13_{name}", "num_units": num_units, "style": 1,
+                                   "tier_current": min(num_units // 2, 3), "tier_total": 3})
+            units = [{"character_id": f"TFT13_{unit}", "rarity": rnd.randint(0, 4), "tier": rnd.choice([1, 1, 2, 2, 3]),
+                      "itemNames": [f"TFT_Item_{item}" for item in rnd.sample(ITEMS, rnd.randint(0, 3))]}
+                     for unit in board]
+            participants.append({
+                "puuid": puuid,
+                "riotIdGameName": self.players[puuid]["gameName"],
+                "riotIdTagline": self.players[puuid]["tagLine"],
+                "placement": placement,
+                "level": rnd.randint(7, 10),
+                "last_round": rnd.randint(20, 40),
+                "total_damage_to_players": rnd.randint(0, 200),
+                "traits": traits,
+                "units": units,
+            })
+        rnd.shuffle(participants)
+        return {"metadata": {"match_id": match_id, "participants": [p["puuid"] for p in participants]},
+                "info": {"game_datetime": game_datetime, "game_length": 2000.0, "participants": participants}}
+
+    def start_game(self, lobby: list[str], game_length=600) -> dict:
+        """
+        Puts the given players into an ongoing game served by the spectator endpoint.
+        """
+        game = {"gameId": 4000000000 + len(self.active_games), "gameLength": game_length, "gameQueueConfigId": 1100,
+                "platformId": "NA1", "participants": [
+                    {"puuid": puuid, "riotId": f"{self.players[puuid]['gameName']}#{self.players[puuid]['tagLine']}"}
+                    for puuid in lobby]}
+        for puuid in lobby:
+            self.active_games[puuid] = game
+        return game
+
+    def end_game(self, game: dict):
+        for participant in game["participants"]:
+            self.active_games.pop(participant["puuid"], None)
+
+    async def account(self, request: web.Request):
+        self.requests["account"] += 1
+        name, tag = request.match_info["name"], request.match_info["tag"]
+        for player in self.players.values():
+            if player["gameName"] == name and player["tagLine"] == tag:
+                return web.json_response(player)
+        raise web.HTTPNotFound()
+
+    async def league(self, request: web.Request):
+        self.requests["league"] += 1
+        tier = request.match_info["tier"]
+        if tier not in self.ladders:
+            raise web.HTTPNotFound()
+        entries = [{"puuid": puuid, "leaguePoints": 1000 - i, "wins": 10, "losses": 10}
+                   for i, puuid in enumerate(self.ladders[tier])]
+        return web.json_response({"tier": tier.upper(), "queue": "RANKED_TFT", "entries": entries})
+
+    async def match_ids(self, request: web.Request):
+        self.requests["match_ids"] += 1
+        puuid = request.match_info["puuid"]
+        if puuid not in self.history:
+            raise web.HTTPNotFound()
+        start = int(request.query.get("start", 0))
+        count = int(request.query.get("count", 20))
+        return web.json_response(self.history[puuid][start:start + count])
+
+    async def match(self, request: web.Request):
+        self.requests["match"] += 1
+        match_id = request.match_info["match_id"]
+        if match_id not in self.matches:
+            raise web.HTTPNotFound()
+        return web.json_response(self.matches[match_id])
+
+    async def active_game(self, request: web.Request):
+        self.requests["active_game"] += 1
+        game = self.active_games.get(request.match_info["puuid"])
+        if game is None:
+            raise web.HTTPNotFound()
+        return web.json_response(game)
+
+    async def start(self, host="127.0.0.1", port=0) -> str:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Riot API server")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--players", type=int, default=10, help="Players per ladder tier")
+    parser.add_argument("--matches", type=int, default=40, help="Number of generated matches")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeRiotServer(players_per_tier=args.players, matches=args.matches)
+    web.run_app(server.app, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import json
+import asyncio
+import hashlib
+import logging
+from collections import Counter
+from typing import TYPE_CHECKING
+from contextlib import aclosing
+
+from aiohttp import web
+
+from riot_api import RiotAPI, format_analysis
+from match_store import participant_rows
+from export import iter_matches
+
+if TYPE_CHECKING:
+    from meta_stats import MetaStats
+
+# Bump when the analysis output changes, it is part of the ETag of immutable match resources
+ANALYSIS_VERSION = 1
+MAX_HISTORY = 100
+META_RETRY_AFTER = 5  # Seconds a client should wait while the meta statistics are loading
+
+
+def parse_riot_id(riot_id: str) -> str | None:
+    """
+    Converts "Name#Tag" (or "Name-Tag", as '#' has to be URL encoded) into the "Name/Tag" form of the Riot API.
+    """
+    for separator in ("#", "-"):
+        name, found, tag = riot_id.rpartition(separator)
+        if found and name and tag:
+            return f"{name}/{tag}"
+    return None
+
+
+def etag_matches(request: web.Request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match", "")
+    return any(tag.strip() in (etag, f"W/{etag}", "*") for tag in if_none_match.split(","))
+
+
+class HTTPAPI():
+    """
+    A read-only HTTP API serving the bot's analysis, running in the bot's event loop.
+
+    Requests share the bot's `RiotAPI` instance, so they use the same connection pool, caches,
+    match store and rate budget as the Discord commands. Finished matches never change, so
+    match resources carry a version based ETag and answer conditional requests with 304 without
+    touching the Riot API. JSON responses are compressed for clients that accept it.
+
+    Endpoints:
+        GET /summoner/{riot_id}/latest: Analysis of the player's most recent match.
+        GET /summoner/{riot_id}/history?count=N: Aggregates over the player's N most recent matches.
+        GET /match/{match_id}/analysis: Analysis of a match.
+        GET /meta/{kind}: A meta table, see `meta_stats.KINDS`, 503 while the meta statistics are loading.
+        GET /healthz: 200 once `readiness` is set, 503 before.
+
+    Args:
+        riot_api (RiotAPI): The bot's API client.
+        meta_stats (MetaStats | None): The bot's meta statistics, /meta answers 503 until it is set.
+        host (str): The interface to listen on.
+        port (int): The port to listen on, 0 picks a free port.
+    """
+
+    def __init__(self, riot_api: RiotAPI, meta_stats: "MetaStats" = None, host="127.0.0.1", port=8088):
+        self.riot_api = riot_api
+        self.meta_stats = meta_stats
+        self.readiness: dict = None  # Set by the bot once it is ready, served by /healthz
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/summoner/{riot_id}/latest", self.latest),
+            web.get("/summoner/{riot_id}/history", self.history),
+            web.get("/match/{match_id}/analysis", self.match_analysis),
+            web.get("/meta/{kind}", self.meta),
+            web.get("/healthz", self.healthz),
+        ])
+        self.runner: web.AppRunner = None
+        self.url: str = None
+
+    async def start(self) -> str:
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{self.host}:{port}"
+        logging.info(f"HTTP API listening on {self.url}")
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def json_response(self, request: web.Request, data, etag=None, cache_control="no-cache") -> web.Response:
+        """
+        Serializes data, answering with 304 if the client already holds this representation.
+        """
+        body = json.dumps(data).encode("utf-8")
+        etag = etag or f'"{hashlib.sha1(body).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if etag_matches(request, etag):
+            return web.Response(status=304, headers=headers)
+        response = web.Response(body=body, content_type="application/json", headers=headers)
+        response.enable_compression()
+        return response
+
+    async def resolve_puuid(self, riot_id) -> str:
+        summoner_name = parse_riot_id(riot_id)
+        if summoner_name is None:
+            raise web.HTTPBadRequest(text="Expected a Riot ID like Name#Tag")
+        summoner_data = await self.riot_api.get_summoner_data(summoner_name)
+        if not summoner_data or not summoner_data.get('puuid'):
+            raise web.HTTPNotFound(text=f"Could not find summoner {riot_id}")
+        return summoner_data['puuid']
+
+    async def analysis(self, match_id) -> dict:
+        match_data = await self.riot_api.get_tft_match_summary(match_id)
+        if not match_data or 'info' not in match_data:
+            raise web.HTTPNotFound(text=f"Could not fetch match {match_id}")
+        return {"match_id": match_id, "game_datetime": match_data['info'].get('game_datetime'),
+                "participants": participant_rows(match_data), "pages": format_analysis(match_data)}
+
+    async def latest(self, request: web.Request) -> web.Response:
+        puuid = await self.resolve_puuid(request.match_info["riot_id"])
+        match_history = await self.riot_api.get_tft_match_history(puuid)
+        if not match_history:
+            raise web.HTTPNotFound(text="Could not fetch match history")
+        match_id = match_history[0]
+        # The latest match changes, but a given latest match does not. The body carries the puuid,
+        # so the ETag differs from the match analysis and between players of the same match
+        etag = f'"{ANALYSIS_VERSION}-latest-{puuid}-{match_id}"'
+        if etag_matches(request, etag):
+            return web.Response(status=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        return self.json_response(request, {"puuid": puuid, **await self.analysis(match_id)}, etag)
+
+    async def match_analysis(self, request: web.Request) -> web.Response:
+        match_id = request.match_info["match_id"]
+        etag = f'"{ANALYSIS_VERSION}-{match_id}"'
+        cache_control = "public, max-age=31536000, immutable"
+        if etag_matches(request, etag):  # Answered before touching the store or the Riot API
+            return web.Response(status=304, headers={"ETag": etag, "Cache-Control": cache_control})
+        return self.json_response(request, await self.analysis(match_id), etag, cache_control)
+
+    async def history(self, request: web.Request) -> web.Response:
+        try:
+            count = min(max(int(request.query.get("count", 20)), 1), MAX_HISTORY)
+        except ValueError:
+            raise web.HTTPBadRequest(text="count must be a number")
+        puuid = await self.resolve_puuid(request.match_info["riot_id"])
+        placements, traits, units = [], Counter(), Counter()
+        match_ids = []
+        async with aclosing(iter_matches(self.riot_api, puuid, count)) as match_stream:
+            async for match_data in match_stream:
+                for row in participant_rows(match_data):
+                    if row['puuid'] != puuid:
+                        continue
+                    match_ids.append(row['match_id'])
+                    placements.append(row['placement'])
+                    traits.update(name for name, _, _ in row['traits'])
+                    units.update(character_id for character_id, _, _ in row['units'])
+        games = len(placements)
+        return self.json_response(request, {
+            "puuid": puuid,
+            "games": games,
+            "avg_placement": sum(placements) / games if games else None,
+            "top4_rate": sum(placement <= 4 for placement in placements) / games if games else None,
+            "win_rate": sum(placement == 1 for placement in placements) / games if games else None,
+            "placements": placements,
+            "match_ids": match_ids,
+            "top_traits": traits.most_common(10),
+            "top_units": units.most_common(10),
+        })
+
+    async def meta(self, request: web.Request) -> web.Response:
+        from meta_stats import KINDS  # NumPy is only imported once the meta statistics are in use
+        kind = request.match_info["kind"]
+        if kind not in KINDS:
+            raise web.HTTPNotFound(text=f"Unknown meta table {kind}")
+        if self.meta_stats is None:
+            raise web.HTTPServiceUnavailable(text="The meta statistics are still loading, please try again in a moment.",
+                                             headers={"Retry-After": str(META_RETRY_AFTER)})
+        # Table computation may cluster boards, keep it off the loop
+        rows = await asyncio.to_thread(self.meta_stats.table, kind)
+        return self.json_response(request, [row._asdict() for row in rows])
+
+    async def healthz(self, request: web.Request) -> web.Response:
+        if self.readiness is None:
+            return web.json_response({"ready": False}, status=503, headers={"Cache-Control": "no-store"})
+        return web.json_response({"ready": True, **self.readiness}, headers={"Cache-Control": "no-store"})
@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple
+
+from riot_api import RiotAPI
+from match_store import MatchStore, parse_match, SOURCE_ADHOC, SOURCE_INGEST
+
+# A match that could not be fetched or parsed this many times is dropped from the checkpoint
+MAX_ATTEMPTS = 3
+
+
+class IngestProgress(NamedTuple):
+    """
+    A snapshot of a running ingestion.
+
+    Attributes:
+        players_done (int): Players whose match history has been expanded.
+        players_total (int): Players found on the requested ladders.
+        matches_done (int): Matches fetched and stored (or skipped as already stored).
+        matches_total (int): Distinct match IDs queued so far.
+        elapsed (float): Seconds since the ingestion started.
+    """
+    players_done: int
+    players_total: int
+    matches_done: int
+    matches_total: int
+    elapsed: float
+
+
+class LadderIngestor():
+    """
+    Pulls apex ladder entries, expands them to match IDs and stores every distinct match.
+
+    Match IDs are deduplicated across players and against the store, stored matches that were
+    looked up ad-hoc are marked as ingested instead of being fetched again. Fetches go through the
+    rate limiter of `riot_api`, decoding and flattening of the match bodies runs in a process
+    pool so the event loop never blocks on JSON parsing. Progress is written to a checkpoint
+    file so an interrupted run resumes where it stopped. Matches that failed stay pending and
+    are retried on resume, up to `MAX_ATTEMPTS` times. The checkpoint is removed once a run
+    finishes without failures, so the next run expands every player again.
+
+    Args:
+        riot_api (RiotAPI): The API client, its rate limiter bounds the request rate.
+        store (MatchStore): Destination of the fetched matches.
+        tiers (list[str]): Apex tiers to ingest, e.g. ["challenger", "grandmaster"].
+        matches_per_player (int): Number of recent matches to pull per player.
+        checkpoint_path (str | None): Path of the resumable checkpoint file, None to disable.
+        workers (int | None): Size of the parsing process pool, defaults to the CPU count.
+        concurrency (int): Number of in-flight match fetches.
+        on_progress (Callable[[IngestProgress], Awaitable | None] | None): Called after every
+            `progress_every` stored matches and once at the end.
+        progress_every (int): See `on_progress`, also the checkpoint interval.
+    """
+
+    def __init__(self, riot_api: RiotAPI, store: MatchStore, tiers=("challenger",), matches_per_player=20,
+                 checkpoint_path=None, workers=None, concurrency=8, on_progress: Callable = None, progress_every=25):
+        self.riot_api = riot_api
+        self.store = store
+        self.tiers = list(tiers)
+        self.matches_per_player = matches_per_player
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+        self.progress_every = progress_every
+
+        self.players_done: set[str] = set()
+        self.players_total = 0
+        self.queued: set[str] = set()
+        self.matches_done = 0
+        self.matches_new = 0
+        self.attempts: dict[str, int] = {}  # Failed attempts of matches that are still pending
+        self.started = 0.0
+
+    def load_checkpoint(self) -> list[str]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return []
+        with open(self.checkpoint_path, "r") as f:
+            checkpoint = json.load(f)
+        if sorted(checkpoint.get("tiers", [])) != sorted(self.tiers):
+            logging.warning(f"Ignoring checkpoint {self.checkpoint_path} of tiers {checkpoint.get('tiers')}")
+            return []
+        self.players_done = set(checkpoint.get("players_done", []))
+        self.attempts = checkpoint.get("attempts", {})
+        logging.info(f"Resuming ingestion: {len(self.players_done)} players done, "
+                     f"{len(checkpoint.get('pending', []))} matches pending")
+        return checkpoint.get("pending", [])
+
+    def save_checkpoint(self, pending):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"tiers": self.tiers, "players_done": sorted(self.players_done), "pending": sorted(pending),
+                       "attempts": self.attempts}, f)
+        os.replace(tmp_path, self.checkpoint_path)  # Atomic, a crash never leaves a half written checkpoint
+
+    def remove_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def record_failure(self, match_id, pending):
+        """
+        Keeps a failed match pending so a resumed run retries it, unless it failed `MAX_ATTEMPTS` times.
+        """
+        self.attempts[match_id] = self.attempts.get(match_id, 0) + 1
+        if self.attempts[match_id] >= MAX_ATTEMPTS:
+            logging.error(f"Giving up on match {match_id} after {MAX_ATTEMPTS} failed attempts")
+            pending.discard(match_id)
+            del self.attempts[match_id]
+
+    def progress(self) -> IngestProgress:
+        return IngestProgress(len(self.players_done), self.players_total, self.matches_done, len(self.queued),
+                              time.monotonic() - self.started)
+
+    async def report(self):
+        progress = self.progress()
+        logging.info(f"Ingestion: players {progress.players_done}/{progress.players_total}, "
+                     f"matches {progress.matches_done}/{progress.matches_total} ({progress.elapsed:.1f}s)")
+        if self.on_progress is not None:
+            result = self.on_progress(progress)
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def ladder_puuids(self) -> list[str]:
+        puuids = []
+        for tier in self.tiers:
+            for entry in await self.riot_api.get_league_entries(tier):
+                puuid = entry.get('puuid')
+                if not puuid and entry.get('summonerId'):  # Older league payloads only carry the summoner id
+                    summoner = await self.riot_api.get_summoner_by_id(entry['summonerId'])
+                    puuid = summoner.get('puuid') if summoner else None
+                if puuid and puuid not in puuids:
+                    puuids.append(puuid)
+        return puuids
+
+    async def run(self) -> IngestProgress:
+        """
+        Runs the ingestion to completion.
+
+        Returns:
+            IngestProgress: The final progress snapshot.
+        """
+        self.started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        known = await asyncio.to_thread(self.store.known_match_ids)
+        adhoc = await asyncio.to_thread(self.store.known_match_ids, SOURCE_ADHOC)
+        queue: asyncio.Queue = asyncio.Queue()
+        pending: set[str] = set()
+        marked: list[str] = []
+
+        def enqueue(match_id):
+            if match_id in self.queued:
+                return
+            self.queued.add(match_id)
+            if match_id in known:
+                if match_id in adhoc:
+                    marked.append(match_id)
+                self.matches_done += 1
+                return
+            pending.add(match_id)
+            queue.put_nowait(match_id)
+
+        async def mark_ingested():
+            if marked:
+                await asyncio.to_thread(self.store.mark_ingested, list(marked))
+                marked.clear()
+
+        for match_id in self.load_checkpoint():
+            enqueue(match_id)
+        await mark_ingested()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+
+            async def fetch_worker():
+                while True:
+                    match_id = await queue.get()
+                    try:
+                        raw = await self.riot_api.get_tft_match_raw(match_id)
+                        parsed = await loop.run_in_executor(pool, parse_match, raw) if raw else None
+                        if parsed is None:
+                            logging.error(f"Could not ingest match {match_id}: no valid match data")
+                            self.record_failure(match_id, pending)
+                            continue
+                        if await asyncio.to_thread(self.store.save_parsed, *parsed, SOURCE_INGEST):
+                            self.matches_new += 1
+                        pending.discard(match_id)
+                        self.attempts.pop(match_id, None)
+                        self.matches_done += 1
+                        if self.matches_done % self.progress_every == 0:
+                            self.save_checkpoint(pending)
+                            await self.report()
+                    except Exception:
+                        logging.exception(f"Failed to ingest match {match_id}")
+                        self.record_failure(match_id, pending)
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(fetch_worker()) for _ in range(self.concurrency)]
+            finished = False
+            try:
+                puuids = await self.ladder_puuids()
+                self.players_total = len(puuids)
+                for puuid in puuids:
+                    if puuid in self.players_done:
+                        continue
+                    match_ids = await self.riot_api.get_tft_match_history(puuid, count=self.matches_per_player)
+                    for match_id in match_ids or []:
+                        enqueue(match_id)
+                    await mark_ingested()
+                    self.players_done.add(puuid)
+                    self.save_checkpoint(pending)
+                await queue.join()
+                finished = True
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if finished and not pending:
+                    self.remove_checkpoint()
+                else:
+                    self.save_checkpoint(pending)
+
+        await self.report()
+        logging.info(f"Ingestion finished: {self.matches_new} new matches stored"
+                     + (f", {len(pending)} failed matches are retried by the next run" if pending else ""))
+        return self.progress()
+
+
+async def ingest(riot_key, tiers, matches_per_player, store_path, checkpoint_path, base_url=None, platform="na1", region="americas", workers=None, compress=False):
+    store = MatchStore(store_path, compress)
+    riot_api = RiotAPI(riot_key, region=region, platform=platform, base_url=base_url, store=store)
+    try:
+        ingestor = LadderIngestor(riot_api, store, tiers=tiers, matches_per_player=matches_per_player,
+                                  checkpoint_path=checkpoint_path, workers=workers)
+        return await ingestor.run()
+    finally:
+        await riot_api.close()
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest high elo TFT matches into the local match store")
+    parser.add_argument("--riot-api-key", help="Riot API Key")
+    parser.add_argument("--tiers", nargs="+", default=["challenger", "grandmaster"], help="Apex tiers to ingest")
+    parser.add_argument("--matches", type=int, default=20, help="Recent matches per player")
+    parser.add_argument("--store", default="matches.db", help="Path of the match store")
+    parser.add_argument("--compress", action="store_true", help="Store new match bodies zstd compressed with a trained dictionary")
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.json", help="Path of the resumable checkpoint")
+    parser.add_argument("--platform", default="na1", help="Platform routing value of the ladder")
+    parser.add_argument("--region", default="americas", help="Regional routing value of the matches")
+    parser.add_argument("--base-url", help="Override the Riot API host, e.g. a local fake server")
+    parser.add_argument("--workers", type=int, help="Size of the parsing process pool")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    riot_key = args.riot_api_key or os.getenv("RIOT_API_KEY")
+    if not riot_key:
+        raise ValueError("Riot API Key must be provided either as argument or environment variable.")
+
+    asyncio.run(ingest(riot_key, args.tiers, args.matches, args.store, args.checkpoint,
+                       base_url=args.base_url, platform=args.platform, region=args.region, workers=args.workers, compress=args.compress))
+
+if __name__ == "__main__":
+    main()
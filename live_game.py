@@ -0,0 +1,98 @@
+import asyncio
+from typing import NamedTuple
+
+from riot_api import RiotAPI
+
+
+class LobbyPlayer(NamedTuple):
+    """
+    A participant of an ongoing game together with their recent results.
+
+    Attributes:
+        name (str): The Riot ID of the player.
+        puuid (str): The puuid of the player.
+        placements (list[int] | None): Placements of the player's recent matches, None if they were
+            skipped to stay within the rate budget.
+    """
+    name: str
+    puuid: str
+    placements: list[int] | None
+
+
+def recent_count(riot_api: RiotAPI, puuids: list[str], recent=5, reserve=20) -> int:
+    """
+    Picks how many recent matches per lobby player fit into the remaining rate budget.
+
+    Every player whose recent placements are not cached costs one match history request plus
+    one request per match that is not stored yet. `reserve` requests are always left for other commands.
+
+    Returns:
+        int: The number of recent matches to look at per player, 0 to skip the stats entirely.
+    """
+    uncached = [puuid for puuid in puuids if riot_api.recent_placements.get((puuid, recent)) is None]
+    if not uncached:
+        return recent
+    budget = riot_api.limiter.headroom() - reserve
+    return max(0, min(recent, budget // len(uncached) - 1))
+
+
+async def lobby_stats(riot_api: RiotAPI, game: dict, recent=5) -> list[LobbyPlayer]:
+    """
+    Fetches the recent placements of every participant of an ongoing game concurrently.
+
+    Args:
+        riot_api (RiotAPI): The API client.
+        game (dict): The active game as returned by `RiotAPI.get_active_game`.
+        recent (int): The number of recent matches to look at per player, lowered if the rate budget is short.
+
+    Returns:
+        list[LobbyPlayer]: The participants in spectator order.
+    """
+    participants = game.get('participants', [])
+    count = recent_count(riot_api, [participant['puuid'] for participant in participants], recent)
+    if count:
+        placements = await asyncio.gather(*(riot_api.get_recent_placements(participant['puuid'], count)
+                                            for participant in participants))
+    else:
+        placements = [None] * len(participants)
+    return [LobbyPlayer(participant.get('riotId', 'Unknown Player'), participant['puuid'], player_placements)
+            for participant, player_placements in zip(participants, placements)]
+
+
+def format_live(game: dict, players: list[LobbyPlayer]) -> str:
+    """
+    Formats an ongoing game and its lobby into an embed description.
+    """
+    minutes, seconds = divmod(int(game.get('gameLength', 0)), 60)
+    lines = [f"**Game Length**: {minutes}:{seconds:02d}\n", "**Lobby** (avg placement / top 4 rate, recent games):"]
+    for player in players:
+        if player.placements:
+            average = sum(player.placements) / len(player.placements)
+            top4 = sum(placement <= 4 for placement in player.placements) / len(player.placements)
+            lines.append(f"**{player.name}**: {average:.2f} / {top4:.0%} ({len(player.placements)} games)")
+        elif player.placements is None:
+            lines.append(f"**{player.name}**: stats skipped (rate limit)")
+        else:
+            lines.append(f"**{player.name}**: no recent games")
+    return "\n".join(lines)
+
+
+def refresh_interval(riot_api: RiotAPI, game: dict, base=30.0, minimum=15.0, maximum=240.0) -> float:
+    """
+    Returns the seconds to wait before refreshing a live game embed.
+
+    Early games are polled slowly and late games (which may end any moment) quickly. The
+    interval grows as the rate budget shrinks, and never drops below the active game cache lifetime.
+    """
+    game_length = game.get('gameLength', 0)
+    interval = base
+    if game_length < 5 * 60:
+        interval *= 2
+    elif game_length > 25 * 60:
+        interval /= 2
+    ratio = riot_api.limiter.headroom_ratio()
+    if ratio < 0.2:
+        interval *= 4
+    elif ratio < 0.5:
+        interval *= 2
+    return min(max(interval, minimum, riot_api.active_game_ttl), maximum)
@@ -0,0 +1,312 @@
+import json
+import sqlite3
+import logging
+import threading
+
+from riot_api import strip_set_prefix
+from compact_match import BlobCodec, zstandard
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    game_datetime INTEGER,
+    data TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT 'adhoc'
+);
+CREATE TABLE IF NOT EXISTS participants (
+    match_id TEXT NOT NULL,
+    puuid TEXT NOT NULL,
+    name TEXT,
+    placement INTEGER,
+    level INTEGER,
+    damage INTEGER,
+    traits TEXT,
+    units TEXT,
+    PRIMARY KEY (match_id, puuid)
+);
+CREATE INDEX IF NOT EXISTS participants_puuid ON participants (puuid);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+
+# First byte of a compressed match body: zstd without or with the store's trained dictionary.
+# Bodies stored as text are uncompressed JSON.
+PLAIN = 0
+DICTIONARY = 1
+# Where a stored match came from: the ladder ingestion or a command that looked it up.
+# Meta statistics are built from ingested matches only, ad-hoc lookups would bias them.
+SOURCE_INGEST = "ingest"
+SOURCE_ADHOC = "adhoc"
+# Number of stored matches before a dictionary is trained, and the number of matches it is trained on
+TRAIN_AFTER = 256
+TRAIN_SAMPLES = 1024
+
+
+def participant_rows(match_data: dict) -> list[dict]:
+    """
+    Flattens a match into one row per participant.
+
+    Args:
+        match_data (dict): The decoded match JSON as returned by the Riot API.
+
+    Returns:
+        list[dict]: One dictionary per participant with the keys 'match_id', 'game_datetime', 'puuid',
+            'name', 'placement', 'level', 'damage', 'traits' and 'units'. Traits are
+            [name, tier_current, num_units] triples of the active traits only, units are
+            [character_id, tier, items] triples. Set and item prefixes are stripped from all identifiers.
+    """
+    match_id = match_data.get('metadata', {}).get('match_id')
+    info = match_data.get('info', {})
+    game_datetime = info.get('game_datetime')
+    rows = []
+    for participant in info.get('participants', []):
+        rows.append({
+            "match_id": match_id,
+            "game_datetime": game_datetime,
+            "puuid": participant.get('puuid'),
+            "name": strip_set_prefix(participant.get('riotIdGameName', 'Unknown Player')),
+            "placement": participant.get('placement'),
+            "level": participant.get('level'),
+            "damage": participant.get('total_damage_to_players', 0),
+            "traits": [[strip_set_prefix(trait['name']), trait['tier_current'], trait.get('num_units', 0)]
+                       for trait in participant.get('traits', []) if trait.get('tier_current', 0) > 0],
+            "units": [[strip_set_prefix(unit['character_id']), unit.get('tier', 1),
+                       [strip_set_prefix(item).replace('TFT_Item_', '') for item in unit.get('itemNames', [])]]
+                      for unit in participant.get('units', [])],
+        })
+    return rows
+
+
+def participant_row(match_id, game_datetime, puuid, name, placement, level, damage, traits, units) -> dict:
+    """
+    Builds a `participant_rows` row from the columns of a stored participant.
+    """
+    return {"match_id": match_id, "game_datetime": game_datetime, "puuid": puuid, "name": name,
+            "placement": placement, "level": level, "damage": damage,
+            "traits": json.loads(traits), "units": json.loads(units)}
+
+
+def parse_match(raw: str) -> tuple[str, int, str, list[dict]] | None:
+    """
+    Decodes a raw match body and flattens it into participant rows.
+
+    This is a module level function so it can be shipped to a process pool.
+
+    Args:
+        raw (str): The undecoded match JSON.
+
+    Returns:
+        tuple | None: (match_id, game_datetime, raw, rows) or None if the body is not a valid match.
+    """
+    try:
+        match_data = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(match_data, dict) or 'info' not in match_data:
+        return None
+    rows = participant_rows(match_data)
+    match_id = match_data.get('metadata', {}).get('match_id')
+    return match_id, match_data['info'].get('game_datetime'), raw, rows
+
+
+class MatchStore():
+    """
+    A local SQLite store of raw matches and their flattened participant rows.
+
+    Matches are immutable once finished, so a stored match never has to be fetched again.
+    Every match records its source, `SOURCE_INGEST` or `SOURCE_ADHOC`. Listeners registered with
+    `add_listener` are called with the participant rows of every newly stored match of their source.
+
+    With `compress`, new match bodies are stored zstd compressed. Once the store holds
+    `TRAIN_AFTER` matches, it trains a dictionary on them when it is opened. The dictionary is
+    kept in the store and compresses later bodies to about a tenth of their JSON size. Compressed
+    and text bodies can be mixed, every store reads both.
+
+    Args:
+        path (str): Path of the SQLite database file, ":memory:" for a throwaway store.
+        compress (bool): Compress newly stored match bodies, requires zstandard.
+    """
+
+    def __init__(self, path="matches.db", compress=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(matches)")}
+        if "source" not in columns:
+            # Stores created before sources were recorded, their origin is unknown so they count as ad-hoc
+            self.conn.execute(f"ALTER TABLE matches ADD COLUMN source TEXT NOT NULL DEFAULT '{SOURCE_ADHOC}'")
+            self.conn.commit()
+        self.listeners = []
+
+        if compress and zstandard is None:
+            logging.warning("Compressing stored matches requires zstandard, matches are stored uncompressed.")
+        self.compress = compress and zstandard is not None
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'zstd_dictionary'").fetchone()
+        self.codecs = {PLAIN: BlobCodec(), DICTIONARY: BlobCodec(row[0]) if row else None}
+        if self.compress and row is None and self.count() >= TRAIN_AFTER:
+            self.train_dictionary()
+
+    def train_dictionary(self) -> bool:
+        """
+        Trains the compression dictionary on the most recent stored matches.
+        A trained dictionary is never replaced, the bodies compressed with it depend on it.
+
+        Returns:
+            bool: True if a dictionary was trained, False if the store already has one.
+        """
+        with self.lock:
+            if self.codecs[DICTIONARY] is not None:
+                return False
+            samples = [self.decode(row[0]).encode("utf-8") for row in self.conn.execute(
+                "SELECT data FROM matches ORDER BY game_datetime DESC LIMIT ?", (TRAIN_SAMPLES,))]
+            dictionary = BlobCodec.train(samples)
+            self.conn.execute("INSERT INTO settings (key, value) VALUES ('zstd_dictionary', ?)", (dictionary,))
+            self.conn.commit()
+            self.codecs[DICTIONARY] = BlobCodec(dictionary)
+        logging.info(f"Trained a {len(dictionary) // 1024} KiB compression dictionary on {len(samples)} matches")
+        return True
+
+    def encode(self, raw: str) -> str | bytes:
+        if not self.compress:
+            return raw
+        tag = PLAIN if self.codecs[DICTIONARY] is None else DICTIONARY
+        return bytes([tag]) + self.codecs[tag].compress(raw.encode("utf-8"))
+
+    def decode(self, data: str | bytes) -> str:
+        if isinstance(data, str):
+            return data
+        if zstandard is None:
+            raise RuntimeError("The store holds compressed matches, reading them requires zstandard")
+        return self.codecs[data[0]].decompress(data[1:]).decode("utf-8")
+
+    def add_listener(self, callback, source=None) -> int:
+        """
+        Registers a callback for newly stored matches.
+
+        Args:
+            callback (Callable[[list[dict]], None]): Called with the participant rows of every new match.
+            source (str | None): Only notify for matches of this source, None for every match.
+
+        Returns:
+            int: The participant rowid up to which rows were stored before the callback was registered,
+                pass it to `iter_participants` to read every earlier row exactly once.
+        """
+        with self.lock:
+            self.listeners.append((callback, source))
+            return self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM participants").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def has_match(self, match_id) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM matches WHERE match_id = ?", (match_id,)).fetchone() is not None
+
+    def known_match_ids(self, source=None) -> set[str]:
+        with self.lock:
+            if source is None:
+                return {row[0] for row in self.conn.execute("SELECT match_id FROM matches")}
+            return {row[0] for row in self.conn.execute("SELECT match_id FROM matches WHERE source = ?", (source,))}
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def get_match(self, match_id) -> dict | None:
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM matches WHERE match_id = ?", (match_id,)).fetchone()
+        return json.loads(self.decode(row[0])) if row else None
+
+    def save_match(self, match_data: dict, raw: str, source=SOURCE_ADHOC) -> bool:
+        rows = participant_rows(match_data)
+        return self.save_parsed(match_data['metadata']['match_id'], match_data['info'].get('game_datetime'), raw, rows, source)
+
+    def save_parsed(self, match_id, game_datetime, raw, rows, source=SOURCE_ADHOC) -> bool:
+        """
+        Stores an already parsed match (see `parse_match`).
+
+        Returns:
+            bool: True if the match was new, False if it was already stored.
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO matches (match_id, game_datetime, data, source) VALUES (?, ?, ?, ?)",
+                (match_id, game_datetime, self.encode(raw), source))
+            if cursor.rowcount == 0:
+                return False
+            self.insert_participants(match_id, rows)
+            self.conn.commit()
+            self.notify(rows, source)
+        return True
+
+    def mark_ingested(self, match_ids) -> int:
+        """
+        Marks ad-hoc matches as ingested, e.g. a ladder match that was looked up before the ingestion reached it.
+
+        Their participant rows are inserted again, so they get rowids past any `add_listener` snapshot
+        and listeners of ingested matches are notified exactly once.
+
+        Returns:
+            int: The number of matches that were ad-hoc.
+        """
+        marked = 0
+        with self.lock:
+            for match_id in match_ids:
+                cursor = self.conn.execute("UPDATE matches SET source = ? WHERE match_id = ? AND source = ?",
+                                           (SOURCE_INGEST, match_id, SOURCE_ADHOC))
+                if cursor.rowcount == 0:
+                    continue
+                rows = [participant_row(*row) for row in self.conn.execute(
+                    "SELECT p.match_id, m.game_datetime, p.puuid, p.name, p.placement, p.level, p.damage, p.traits, p.units "
+                    "FROM participants p JOIN matches m ON m.match_id = p.match_id WHERE p.match_id = ? ORDER BY p.rowid",
+                    (match_id,))]
+                self.conn.execute("DELETE FROM participants WHERE match_id = ?", (match_id,))
+                self.insert_participants(match_id, rows)
+                self.conn.commit()
+                self.notify(rows, SOURCE_INGEST)
+                marked += 1
+        return marked
+
+    def insert_participants(self, match_id, rows):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO participants VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(match_id, row['puuid'], row['name'], row['placement'], row['level'], row['damage'],
+              json.dumps(row['traits']), json.dumps(row['units'])) for row in rows])
+
+    def notify(self, rows, source):
+        # Notified under the lock so a listener never misses or double counts a match around `add_listener`
+        for callback, listener_source in self.listeners:
+            if listener_source is not None and listener_source != source:
+                continue
+            try:
+                callback(rows)
+            except Exception:
+                logging.exception("Match store listener failed")
+
+    def iter_participants(self, until_rowid=None, batch_size=1000, source=None):
+        """
+        Yields every stored participant row, in the format of `participant_rows`.
+
+        Args:
+            until_rowid (int | None): Only yield rows up to this rowid (see `add_listener`).
+            batch_size (int): Number of rows read per query.
+            source (str | None): Only yield rows of matches of this source, None for every match.
+        """
+        last_rowid = 0
+        until_rowid = until_rowid if until_rowid is not None else 2 ** 63 - 1
+        while True:
+            with self.lock:
+                batch = self.conn.execute(
+                    "SELECT p.rowid, p.match_id, m.game_datetime, p.puuid, p.name, p.placement, p.level, p.damage, p.traits, p.units "
+                    "FROM participants p JOIN matches m ON m.match_id = p.match_id "
+                    "WHERE p.rowid > ? AND p.rowid <= ? AND (? IS NULL OR m.source = ?) ORDER BY p.rowid LIMIT ?",
+                    (last_rowid, until_rowid, source, source, batch_size)).fetchall()
+            if not batch:
+                return
+            for row in batch:
+                yield participant_row(*row[1:])
+            last_rowid = batch[-1][0]
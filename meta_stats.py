@@ -0,0 +1,296 @@
+import time
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from match_store import MatchStore, SOURCE_INGEST
+
+KINDS = ("traits", "combos", "units", "items", "comps")
+
+# Bits set per byte value, fallback for NumPy versions without np.bitwise_count
+POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Counts the set bits of packed uint64 vectors along the last axis.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    as_bytes = words.view(np.uint8).reshape(*words.shape[:-1], -1)
+    return POPCOUNT8[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def jaccard(boards: np.ndarray, centroids: np.ndarray, chunk=8192) -> np.ndarray:
+    """
+    Computes the Jaccard similarity between every board and every centroid.
+
+    Args:
+        boards (np.ndarray): (n, words) bit-packed board vectors.
+        centroids (np.ndarray): (k, words) bit-packed centroid vectors.
+        chunk (int): Boards processed per step, bounds the (chunk, k, words) intermediate.
+
+    Returns:
+        np.ndarray: (n, k) float32 similarities, 0 for two empty vectors.
+    """
+    result = np.empty((len(boards), len(centroids)), dtype=np.float32)
+    centroid_bits = popcount(centroids)
+    for start in range(0, len(boards), chunk):
+        block = boards[start:start + chunk]
+        inter = popcount(block[:, None, :] & centroids[None, :, :])
+        union = popcount(block)[:, None] + centroid_bits[None, :] - inter
+        result[start:start + chunk] = np.divide(inter, union, out=np.zeros(inter.shape, dtype=np.float32), where=union > 0)
+    return result
+
+
+class MetaRow(NamedTuple):
+    """
+    One line of a meta table.
+
+    Attributes:
+        key (str): The trait (with tier), trait combination, unit, item or comp label.
+        games (int): Number of boards the key appeared on.
+        avg_placement (float): Average placement of those boards.
+        top4_rate (float): Share of those boards placing 1st to 4th.
+    """
+    key: str
+    games: int
+    avg_placement: float
+    top4_rate: float
+
+
+class MetaStats():
+    """
+    Incrementally maintained placement statistics over participant rows of ingested ladder matches.
+
+    Trait, trait combination, unit and item tables are plain running sums updated per board.
+    Boards are additionally kept as bit-packed unit/trait vectors so comps can be clustered
+    with vectorized Jaccard similarity. Computed tables are cached and only recomputed when
+    new boards arrived and the cached table is older than `refresh_interval`.
+
+    `add_rows` runs as a match store listener under the store's lock, so `lock` is only held for
+    short updates and copies. Comps are clustered on a snapshot of the boards outside of it.
+
+    Args:
+        clusters (int): Number of comps to cluster boards into.
+        min_games (int): Keys seen on fewer boards are left out of the tables.
+        refresh_interval (float): Minimum seconds between two recomputations of a table.
+    """
+
+    def __init__(self, clusters=16, min_games=10, refresh_interval=60.0):
+        self.clusters = clusters
+        self.min_games = min_games
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.comps_lock = threading.Lock()  # Serializes clustering, which runs without `lock`
+        # key -> [games, placement sum, top 4 count] per kind
+        self.totals: dict[str, dict[str, list[int]]] = {kind: {} for kind in KINDS if kind != "comps"}
+        self.features: dict[str, int] = {}  # "u:Jinx" / "t:Rebel" -> bit index
+        self.boards = np.zeros((1024, 4), dtype=np.uint64)
+        self.placements = np.zeros(1024, dtype=np.int8)
+        self.size = 0
+        self.version = 0
+        self.centroids: np.ndarray = None
+        self.cache: dict[str, tuple[int, float, list[MetaRow]]] = {}
+
+    def load(self, store: MatchStore):
+        """
+        Subscribes to newly ingested matches and adds every already ingested board, each exactly once.
+        Matches looked up ad-hoc are left out, they are biased towards the players using the bot.
+        """
+        until_rowid = store.add_listener(self.add_rows, SOURCE_INGEST)
+        batch = []
+        for row in store.iter_participants(until_rowid, source=SOURCE_INGEST):
+            batch.append(row)
+            if len(batch) >= 1000:
+                self.add_rows(batch)
+                batch = []
+        self.add_rows(batch)
+
+    def feature(self, name) -> int:
+        index = self.features.get(name)
+        if index is None:
+            index = self.features[name] = len(self.features)
+            if index >= self.boards.shape[1] * 64:
+                self.boards = np.concatenate([self.boards, np.zeros_like(self.boards)], axis=1)
+                if self.centroids is not None:
+                    self.centroids = np.concatenate([self.centroids, np.zeros_like(self.centroids)], axis=1)
+        return index
+
+    def count(self, kind, key, placement):
+        entry = self.totals[kind].setdefault(key, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += placement
+        entry[2] += placement <= 4
+
+    def add_rows(self, rows: list[dict]):
+        """
+        Adds participant rows (see `match_store.participant_rows`) to the statistics.
+        """
+        rows = [row for row in rows if row.get('placement')]
+        if not rows:
+            return
+        with self.lock:
+            if self.size + len(rows) > len(self.boards):
+                grow = max(len(self.boards), len(rows))
+                self.boards = np.concatenate([self.boards, np.zeros((grow, self.boards.shape[1]), dtype=np.uint64)])
+                self.placements = np.concatenate([self.placements, np.zeros(grow, dtype=np.int8)])
+            for row in rows:
+                placement = row['placement']
+                bits = []
+                for name, tier, _ in row['traits']:
+                    self.count("traits", f"{name} {tier}", placement)
+                    bits.append(self.feature(f"t:{name}"))
+                self.count("combos", " / ".join(sorted(f"{name} {tier}" for name, tier, _ in row['traits'])) or "No traits", placement)
+                # Duplicate units and items count once, the tables count boards
+                for character_id in dict.fromkeys(character_id for character_id, _, _ in row['units']):
+                    self.count("units", character_id, placement)
+                    bits.append(self.feature(f"u:{character_id}"))
+                for item in dict.fromkeys(item for _, _, items in row['units'] for item in items):
+                    self.count("items", item, placement)
+                board = self.boards[self.size]
+                for bit in bits:
+                    board[bit // 64] |= np.uint64(1 << (bit % 64))
+                self.placements[self.size] = placement
+                self.size += 1
+            self.version += 1
+
+    def table(self, kind, force=False) -> list[MetaRow]:
+        """
+        Returns the cached table of a kind, recomputing it if it is stale.
+
+        Args:
+            kind (str): One of "traits", "combos", "units", "items" or "comps".
+            force (bool): Recompute even if the cached table is younger than `refresh_interval`.
+
+        Returns:
+            list[MetaRow]: Rows sorted by average placement, best first.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown meta table {kind}, expected one of {', '.join(KINDS)}")
+        cached = self.cache.get(kind)
+        now = time.monotonic()
+        if cached and (cached[0] == self.version or (not force and now - cached[1] < self.refresh_interval)):
+            return cached[2]
+        if kind == "comps":
+            version, rows = self.comps()
+        else:
+            with self.lock:
+                version = self.version
+                rows = [MetaRow(key, games, placement_sum / games, top4 / games)
+                        for key, (games, placement_sum, top4) in self.totals[kind].items() if games >= self.min_games]
+        rows.sort(key=lambda row: (row.avg_placement, -row.games))
+        self.cache[kind] = (version, now, rows)
+        return rows
+
+    def refresh(self):
+        """
+        Recomputes every stale table, e.g. from a background thread after an ingestion.
+        """
+        for kind in KINDS:
+            self.table(kind, force=True)
+
+    def comps(self, iterations=10) -> tuple[int, list[MetaRow]]:
+        """
+        Clusters the boards into comps.
+
+        A k-modes style clustering on Jaccard similarity: every board joins its most similar
+        centroid, every centroid becomes the set of features present on at least half of its boards.
+        The previous centroids seed the next run, so clusters stay stable as boards are added.
+
+        Returns:
+            tuple[int, list[MetaRow]]: The version of the clustered boards and the comps.
+        """
+        with self.comps_lock:
+            with self.lock:
+                version = self.version
+                size = self.size
+                boards = self.boards[:size].copy()
+                placements = self.placements[:size].copy()
+                names = {index: name for name, index in self.features.items()}
+                centroids = self.centroids.copy() if self.centroids is not None else None
+            if size == 0:
+                return version, []
+            k = min(self.clusters, size)
+            if centroids is None or len(centroids) != k:
+                centroids = self.seed(boards, k)
+            assignment = self.cluster(boards, centroids, iterations)
+            with self.lock:
+                # Boards added meanwhile may have introduced features and widened the vectors
+                width = self.boards.shape[1]
+                self.centroids = np.pad(centroids, ((0, 0), (0, width - centroids.shape[1])))
+
+        centroid_bits = np.unpackbits(centroids.view(np.uint8), axis=1, bitorder="little")
+        rows = []
+        for cluster in range(k):
+            members = assignment == cluster
+            games = int(members.sum())
+            if games < self.min_games:
+                continue
+            features = [names[i] for i in np.flatnonzero(centroid_bits[cluster]) if i in names]
+            traits = [name[2:] for name in features if name.startswith("t:")]
+            units = [name[2:] for name in features if name.startswith("u:")]
+            label = f"{' '.join(traits[:3]) or 'Flex'}: {', '.join(units)}"
+            rows.append(MetaRow(label, games, float(placements[members].mean()), float((placements[members] <= 4).mean())))
+        return version, rows
+
+    @staticmethod
+    def cluster(boards: np.ndarray, centroids: np.ndarray, iterations: int) -> np.ndarray:
+        """
+        Runs the k-modes iterations, updating `centroids` in place.
+
+        Returns:
+            np.ndarray: The centroid index of every board.
+        """
+        bits = np.unpackbits(boards.view(np.uint8), axis=1, bitorder="little")
+        assignment = None
+        for _ in range(iterations):
+            new_assignment = jaccard(boards, centroids).argmax(axis=1)
+            if assignment is not None and np.array_equal(assignment, new_assignment):
+                break
+            assignment = new_assignment
+            for cluster in range(len(centroids)):
+                members = bits[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = np.packbits(members.mean(axis=0) >= 0.5, bitorder="little").view(np.uint64)
+        return assignment
+
+    @staticmethod
+    def seed(boards: np.ndarray, k: int, seed=0) -> np.ndarray:
+        """
+        Picks k initial centroids k-means++ style, favouring boards dissimilar to the ones already picked.
+        """
+        rng = np.random.default_rng(seed)
+        picked = [int(rng.integers(len(boards)))]
+        distance = 1.0 - jaccard(boards, boards[picked]).ravel()
+        for _ in range(1, k):
+            weights = distance ** 2
+            total = weights.sum()
+            index = int(rng.choice(len(boards), p=weights / total)) if total > 0 else int(rng.integers(len(boards)))
+            picked.append(index)
+            distance = np.minimum(distance, 1.0 - jaccard(boards, boards[[index]]).ravel())
+        return boards[picked].copy()
+
+
+def format_pages(rows: list[MetaRow], kind, per_page=10) -> list[str]:
+    """
+    Formats a meta table into embed pages.
+
+    Args:
+        rows (list[MetaRow]): The table as returned by `MetaStats.table`.
+        kind (str): The kind of the table, used as heading.
+        per_page (int): Rows per page.
+
+    Returns:
+        list[str]: One markdown string per page.
+    """
+    if not rows:
+        return [f"Not enough stored matches for **{kind}** statistics yet."]
+    pages = []
+    for start in range(0, len(rows), per_page):
+        lines = [f"**{kind.title()}** (avg placement / top 4 rate / games)\n"]
+        for rank, row in enumerate(rows[start:start + per_page], start=start + 1):
+            lines.append(f"{rank}. **{row.key}**: {row.avg_placement:.2f} / {row.top4_rate:.0%} / {row.games}")
+        pages.append("\n".join(lines))
+    return pages
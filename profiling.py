@@ -0,0 +1,363 @@
+import os
+import sys
+import json
+import time
+import marshal
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+
+class CommandTrace():
+    """
+    Wall clock time spent per stage while handling one command.
+
+    Stages nest freely and may overlap (e.g. concurrent requests), so the stage sum can exceed the total.
+
+    Args:
+        name (str): The name of the command.
+        args (str): The command arguments, for the report.
+    """
+
+    def __init__(self, name, args=""):
+        self.name = name
+        self.args = args
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.stages: Counter[str] = Counter()
+        self.counts: Counter[str] = Counter()
+
+    def add(self, stage, seconds):
+        self.stages[stage] += seconds
+        self.counts[stage] += 1
+
+    def finish(self) -> float:
+        self.total = time.perf_counter() - self.started
+        return self.total
+
+    def to_dict(self) -> dict:
+        return {"command": self.name, "args": self.args, "total": self.total,
+                "stages": {stage: {"seconds": seconds, "count": self.counts[stage]}
+                           for stage, seconds in self.stages.most_common()}}
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.stages.most_common())
+        return f"!{self.name} took {self.total * 1000:.0f}ms ({stages or 'no stages'})"
+
+
+# The trace of the command handled by the current task, copied into subtasks and worker threads
+CURRENT_TRACE: contextvars.ContextVar[CommandTrace | None] = contextvars.ContextVar("CURRENT_TRACE", default=None)
+
+
+@contextmanager
+def trace_stage(stage):
+    """
+    Adds the time spent in the block to the current command trace, a no-op outside of traced commands.
+    """
+    trace = CURRENT_TRACE.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.perf_counter() - started)
+
+
+class SamplingProfiler():
+    """
+    Samples the call stack of one thread (the event loop) from a background thread.
+
+    Overhead is one stack walk per interval regardless of how much code runs, so the profiler
+    can stay enabled in production.
+
+    Args:
+        thread_id (int): The thread to sample, defaults to the calling thread.
+        interval (float): Seconds between two samples.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter[tuple] = Counter()
+        self.lock = threading.Lock()  # Guards `stacks`, the dumps run while the sampler keeps adding to it
+        self.started = 0.0
+        self.stopped = 0.0
+        self.running = threading.Event()
+        self.thread: threading.Thread = None
+
+    def start(self):
+        if self.running.is_set():
+            return
+        with self.lock:
+            self.stacks.clear()
+        self.started = time.time()
+        self.running.set()
+        self.thread = threading.Thread(target=self.sample, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+        self.stopped = time.time()
+
+    def sample(self):
+        while self.running.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                with self.lock:
+                    self.stacks[tuple(reversed(stack))] += 1  # Root first
+            time.sleep(self.interval)
+
+    def snapshot(self) -> dict[tuple, int]:
+        """
+        Returns a copy of the sample counts per stack that is safe to iterate while sampling continues.
+        """
+        with self.lock:
+            return dict(self.stacks)
+
+    def dump_speedscope(self, path):
+        """
+        Writes the samples in the speedscope format (https://www.speedscope.app).
+        """
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.snapshot().items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[2], "file": frame[0], "line": frame[1]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{"type": "sampled", "name": "event loop", "unit": "seconds", "startValue": 0,
+                          "endValue": sum(weights), "samples": samples, "weights": weights}],
+            "name": f"TFTBot {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started))}",
+            "activeProfileIndex": 0,
+            "exporter": "TFTBot profiling",
+        }
+        with open(path, "w") as f:
+            json.dump(profile, f)
+
+    def dump_pstats(self, path):
+        """
+        Writes the samples as a pstats file, readable with `python -m pstats` or snakeviz.
+
+        Call counts are sample counts and times are sample counts times the interval.
+        """
+        inclusive, own = Counter(), Counter()
+        callers: dict[tuple, Counter] = {}
+        for stack, count in self.snapshot().items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                inclusive[frame] += count
+            for caller, callee in set(zip(stack, stack[1:])):
+                callers.setdefault(callee, Counter())[caller] += count
+        stats = {}
+        for frame, count in inclusive.items():
+            frame_callers = {caller: (n, n, 0.0, n * self.interval) for caller, n in callers.get(frame, {}).items()}
+            stats[frame] = (count, count, own[frame] * self.interval, count * self.interval, frame_callers)
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
+
+
+def describe_stack(frame, depth=3) -> str:
+    """
+    Describes the innermost frames of a stack, e.g. "draw (board_render.py:120) <- render_to_disk (board_render.py:139)".
+    """
+    parts = []
+    while frame is not None and len(parts) < depth:
+        parts.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return " <- ".join(parts) or "unknown"
+
+
+class LoopLagMonitor():
+    """
+    Detects callbacks that block the event loop for longer than `threshold` seconds.
+
+    A heartbeat task on the loop wakes up every `interval` seconds and measures how late it was.
+    A watchdog thread checks the heartbeat and, while it is overdue, records where the loop thread
+    is stuck. This costs one wakeup per interval, unlike asyncio debug mode, which records a stack
+    for every scheduled callback.
+
+    Args:
+        threshold (float): Blocks longer than this are recorded, in seconds.
+        interval (float): Seconds between two heartbeats.
+        maxlen (int): Number of recorded blocks to keep.
+    """
+
+    def __init__(self, threshold=0.1, interval=0.01, maxlen=200):
+        self.threshold = threshold
+        self.interval = interval
+        self.maxlen = maxlen
+        self.records: list[tuple[float, str, float]] = []  # (time, where the loop was blocked, seconds)
+        self.beat = 0.0
+        self.blocked_at: tuple[float, str] = None  # (heartbeat the block started after, location)
+        self.thread_id: int = None
+        self.running = threading.Event()
+        self.task: asyncio.Task = None
+        self.thread: threading.Thread = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """
+        Starts monitoring, must be called from the thread running `loop`.
+        """
+        if self.running.is_set():
+            return
+        self.thread_id = threading.get_ident()
+        self.beat = time.perf_counter()
+        self.running.set()
+        self.task = loop.create_task(self.heartbeat())
+        self.thread = threading.Thread(target=self.watch, name="loop-lag-monitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.task is not None:
+            self.task.cancel()
+        if self.thread is not None:
+            self.thread.join()
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = now - self.beat - self.interval
+            if lag > self.threshold:
+                blocked_at = self.blocked_at
+                location = blocked_at[1] if blocked_at is not None and blocked_at[0] == self.beat else "unknown"
+                self.records.append((time.time(), location, lag))
+                del self.records[:-self.maxlen]
+            self.beat = now
+
+    def watch(self):
+        while self.running.is_set():
+            time.sleep(self.threshold / 2)
+            beat = self.beat
+            overdue = time.perf_counter() - beat > self.interval + self.threshold / 2
+            if overdue and (self.blocked_at is None or self.blocked_at[0] != beat):
+                self.blocked_at = (beat, describe_stack(sys._current_frames().get(self.thread_id)))
+
+
+class Profiler():
+    """
+    The bot's profiling mode: event loop sampling, slow command traces and slow callback detection.
+
+    While enabled, every command is traced (see `CommandTrace`) and traces slower than
+    `slow_command` seconds are written to `directory`. `LoopLagMonitor` reports callbacks
+    that block the loop for longer than `slow_callback` seconds.
+
+    Args:
+        directory (str): Where profiles and traces are written.
+        slow_command (float): Commands taking longer are dumped, in seconds.
+        slow_callback (float): Loop callbacks taking longer are reported, in seconds.
+        interval (float): Sampling interval of the event loop profiler, in seconds.
+    """
+
+    def __init__(self, directory="profiles", slow_command=2.0, slow_callback=0.1, interval=0.005):
+        self.directory = directory
+        self.slow_command = slow_command
+        self.slow_callback = slow_callback
+        self.interval = interval
+        self.enabled = False
+        self.sampler: SamplingProfiler = None
+        self.slow_callbacks = LoopLagMonitor(slow_callback)
+        self.slow_commands: list[dict] = []
+
+    def enable(self, loop: asyncio.AbstractEventLoop = None):
+        """
+        Enables profiling, must be called from the event loop thread.
+        """
+        if self.enabled:
+            return
+        loop = loop or asyncio.get_running_loop()
+        os.makedirs(self.directory, exist_ok=True)
+        self.sampler = SamplingProfiler(interval=self.interval)
+        self.sampler.start()
+        self.slow_callbacks.threshold = self.slow_callback
+        self.slow_callbacks.start(loop)
+        self.enabled = True
+        logging.info(f"Profiling enabled, writing to {self.directory}")
+
+    def disable(self) -> bool:
+        """
+        Disables profiling, the collected samples are kept for `dump`.
+
+        Returns:
+            bool: True if profiling was enabled.
+        """
+        if not self.enabled:
+            return False
+        self.sampler.stop()
+        self.slow_callbacks.stop()
+        self.enabled = False
+        logging.info("Profiling disabled")
+        return True
+
+    def dump(self) -> list[str]:
+        """
+        Writes the event loop samples collected so far as speedscope and pstats files.
+        """
+        if self.sampler is None:
+            return []
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        speedscope = os.path.join(self.directory, f"loop-{stamp}.speedscope.json")
+        pstats = os.path.join(self.directory, f"loop-{stamp}.pstats")
+        self.sampler.dump_speedscope(speedscope)
+        self.sampler.dump_pstats(pstats)
+        return [speedscope, pstats]
+
+    def begin_command(self, name, args="") -> CommandTrace | None:
+        if not self.enabled:
+            return None
+        trace = CommandTrace(name, args)
+        CURRENT_TRACE.set(trace)
+        return trace
+
+    def end_command(self, trace: CommandTrace | None):
+        if trace is None:
+            return
+        if trace.finish() < self.slow_command:
+            return
+        logging.warning(f"Slow command: {trace.summary()}")
+        record = trace.to_dict()
+        self.slow_commands.append(record)
+        del self.slow_commands[:-100]
+        path = os.path.join(self.directory, f"command-{trace.name}-{time.strftime('%Y%m%d-%H%M%S')}-{id(trace):x}.json")
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+
+    def report(self, top=5) -> str:
+        """
+        Summarizes the slowest commands and loop callbacks seen since profiling was enabled.
+        """
+        lines = [f"**Profiling**: {'on' if self.enabled else 'off'}"]
+        commands = sorted(self.slow_commands, key=lambda record: -record["total"])[:top]
+        lines.append(f"\n**Slow commands** (> {self.slow_command:.1f}s):")
+        for record in commands:
+            stages = ", ".join(f"{stage} {data['seconds']:.2f}s" for stage, data in record["stages"].items())
+            lines.append(f"!{record['command']} {record['args']}: {record['total']:.2f}s ({stages})")
+        if not commands:
+            lines.append("None")
+        callbacks = sorted(self.slow_callbacks.records, key=lambda record: -record[2])[:top]
+        lines.append(f"\n**Loop blocked** (> {self.slow_callback * 1000:.0f}ms):")
+        for _, location, duration in callbacks:
+            lines.append(f"{duration * 1000:.0f}ms: `{location[:150]}`")
+        if not callbacks:
+            lines.append("None")
+        return "\n".join(lines)
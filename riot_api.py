@@ -1,74 +1,285 @@
+import time
+import json
 import logging
 import asyncio
+from collections import deque, OrderedDict
 
 import aiohttp
 
+from profiling import trace_stage
+from compact_match import MatchCache, CompactMatch
+
+# Development key limits: 20 requests every 1 second and 100 requests every 2 minutes
+DEFAULT_RATE_LIMITS = ((20, 1.0), (100, 120.0))
+
+# Remove both 'TFT13_' and 'tft13_' prefixes
+def strip_set_prefix(name: str) -> str:
+    return name.replace("TFT13_", "").replace("tft13_", "")
+
+# Returned by get_api_data for a 404 when the caller asked to tell "not found" apart from errors
+NOT_FOUND = object()
+
+class TTLCache():
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+
+    # Return the cached value or default once it expired
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        value, expires = entry
+        if time.monotonic() >= expires:
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+class RateLimiter():
+
+    def __init__(self, limits=DEFAULT_RATE_LIMITS):
+        self.limits = limits
+        self.windows = [deque() for _ in limits]
+        self.lock = asyncio.Lock()
+
+    # Wait until a request fits into every window, then record it
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                wait = 0.0
+                for (limit, period), window in zip(self.limits, self.windows):
+                    while window and now - window[0] >= period:
+                        window.popleft()
+                    if len(window) >= limit:
+                        wait = max(wait, period - (now - window[0]))
+                if wait <= 0:
+                    for window in self.windows:
+                        window.append(now)
+                    return
+                await asyncio.sleep(wait)
+
+    # Number of requests left in the longest window, the sustained budget (short windows only delay requests)
+    def headroom(self) -> int:
+        (limit, period), window = max(zip(self.limits, self.windows), key=lambda item: item[0][1])
+        now = time.monotonic()
+        return max(limit - sum(1 for sent in window if now - sent < period), 0)
+
+    # Share of the longest window that is still free, 1.0 when idle
+    def headroom_ratio(self) -> float:
+        limit, _ = max(self.limits, key=lambda item: item[1])
+        return self.headroom() / limit
+
+# Idle pooled connections and resolved hosts are kept this many seconds, aiohttp's defaults (15s and 10s)
+# would drop the connections the warmup opened before the first command arrives
+KEEPALIVE_TIMEOUT = 300
+DNS_CACHE_TTL = 300
+
 class RiotAPI():
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, region="americas", platform="na1", base_url=None, rate_limits=DEFAULT_RATE_LIMITS, store=None, match_cache: MatchCache = None):
         self.api_key = api_key
         self.headers = {'X-Riot-Token': self.api_key}
+        # base_url overrides both hosts, e.g. to point at a local fake Riot server
+        self.regional_url = base_url or f"https://{region}.api.riotgames.com"
+        self.platform_url = base_url or f"https://{platform}.api.riotgames.com"
+        self.limiter = RateLimiter(rate_limits)
+        self.store = store
+        # Recently used matches, held packed, see compact_match.CompactMatch for the fields they keep
+        self.match_cache = match_cache
+        self.session: aiohttp.ClientSession = None
+        # Active games change every few seconds, "not in game" answers are cached longer
+        self.active_games = TTLCache()
+        self.active_game_ttl = 15
+        self.not_in_game_ttl = 60
+        self.recent_placements = TTLCache()
+        self.recent_placements_ttl = 300
+
+    # Helper function to reuse one session (and its connection pool) for all requests
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL)
+            self.session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    # Helper function to open pooled connections to both hosts before the first request needs them
+    # The DNS lookup and TLS handshake happen here, the requests hit no endpoint and are not rate limited
+    async def warmup(self) -> float:
+        session = self.get_session()
+        started = time.perf_counter()
+
+        async def connect(url):
+            try:
+                async with session.head(url, allow_redirects=False) as response:
+                    await response.read()
+            except aiohttp.ClientError as e:
+                logging.warning(f"Could not open a connection to {url}: {e}")
+
+        await asyncio.gather(*(connect(url) for url in dict.fromkeys((self.regional_url, self.platform_url))))
+        return time.perf_counter() - started
 
     # Helper function to get data from the API with retry logic
-    async def get_api_data(self, url, retries=5, backoff_factor=1.5):
-        async with aiohttp.ClientSession() as session:
-            attempt = 0
-            while attempt < retries:
-                try:
-                    async with session.get(url, headers=self.headers) as response:
+    # With raw=True the undecoded response body is returned so it can be parsed off the event loop
+    # With not_found set, a 404 returns that value instead of being logged as an error
+    async def get_api_data(self, url, retries=5, backoff_factor=1.5, raw=False, not_found=None):
+        session = self.get_session()
+        attempt = 0
+        while attempt < retries:
+            try:
+                with trace_stage("riot.rate_limit"):
+                    await self.limiter.acquire()
+                with trace_stage("riot.network"):
+                    async with session.get(url) as response:
                         if response.status == 429:  # Too many requests
                             retry_after = response.headers.get('Retry-After', 1)
                             await asyncio.sleep(int(retry_after) * backoff_factor ** attempt)
                             attempt += 1
                             continue
+                        if response.status == 404 and not_found is not None:
+                            return not_found
                         response.raise_for_status()  # This will raise an exception for non-2xx status codes
-                        return await response.json()
-                except aiohttp.ClientError as e:
-                    logging.error(f"Request failed: {e}")
-                    return None
-            logging.error("Maximum retry attempts reached.")
-            return None
+                        body = await response.text()
+                if raw:
+                    return body
+                with trace_stage("riot.parse"):
+                    return json.loads(body)
+            except aiohttp.ClientError as e:
+                logging.error(f"Request failed: {e}")
+                return None
+            except ValueError as e:  # Body is not valid JSON
+                logging.error(f"Invalid response: {e}")
+                return None
+        logging.error("Maximum retry attempts reached.")
+        return None
 
     # Helper function to get summoner data
     async def get_summoner_data(self, summoner_name) -> dict:
-        return await self.get_api_data(f"https://americas.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{summoner_name}")
+        return await self.get_api_data(f"{self.regional_url}/riot/account/v1/accounts/by-riot-id/{summoner_name}")
+
+    # Helper function to get summoner data (including the puuid) by encrypted summoner id
+    async def get_summoner_by_id(self, summoner_id) -> dict:
+        return await self.get_api_data(f"{self.platform_url}/tft/summoner/v1/summoners/{summoner_id}")
+
+    # Helper function to get the ladder entries of an apex tier (challenger, grandmaster or master)
+    async def get_league_entries(self, tier) -> list[dict]:
+        league = await self.get_api_data(f"{self.platform_url}/tft/league/v1/{tier}")
+        if league and isinstance(league, dict):
+            return league.get('entries', [])
+        return []
 
     # Helper function to get match history
-    async def get_tft_match_history(self, puuid) -> dict:
-        return await self.get_api_data(f"https://americas.api.riotgames.com/tft/match/v1/matches/by-puuid/{puuid}/ids?start=0&count=1")
+    async def get_tft_match_history(self, puuid, count=1, start=0) -> list[str]:
+        return await self.get_api_data(f"{self.regional_url}/tft/match/v1/matches/by-puuid/{puuid}/ids?start={start}&count={count}")
+
+    # Helper function to get the ongoing game of a player, NOT_FOUND if the player is not in a game and None on errors
+    async def get_active_game(self, puuid) -> dict | None:
+        cached = self.active_games.get(puuid)
+        if cached is not None:
+            return cached
+        game = await self.get_api_data(f"{self.platform_url}/lol/spectator/tft/v5/active-games/by-puuid/{puuid}", not_found=NOT_FOUND)
+        if game is NOT_FOUND:
+            self.active_games.set(puuid, NOT_FOUND, self.not_in_game_ttl)
+        elif game is not None:
+            self.active_games.set(puuid, game, self.active_game_ttl)
+        return game
+
+    # Helper function to get the placements of a player's most recent matches
+    async def get_recent_placements(self, puuid, count=5) -> list[int]:
+        cached = self.recent_placements.get((puuid, count))
+        if cached is not None:
+            return cached
+        match_ids = await self.get_tft_match_history(puuid, count=count)
+        matches = await asyncio.gather(*(self.get_tft_match_summary(match_id) for match_id in match_ids or []))
+        placements = []
+        complete = match_ids is not None
+        for match_data in matches:
+            if not match_data or 'info' not in match_data:
+                complete = False
+                continue
+            for participant in match_data['info'].get('participants', []):
+                if participant.get('puuid') == puuid and participant.get('placement'):
+                    placements.append(participant['placement'])
+        # Failed requests are not cached, the next lookup retries them
+        if complete:
+            self.recent_placements.set((puuid, count), placements, self.recent_placements_ttl)
+        return placements
+
+    # Helper function to get the undecoded match JSON
+    async def get_tft_match_raw(self, match_id) -> str:
+        return await self.get_api_data(f"{self.regional_url}/tft/match/v1/matches/{match_id}", raw=True)
 
-    # Helper function to get match data
+    # Helper function to get the full match JSON, from the match store or the Riot API
     async def get_tft_match_data(self, match_id) -> dict:
-        return await self.get_api_data(f"https://americas.api.riotgames.com/tft/match/v1/matches/{match_id}")
+        match_data = None
+        # The store is read and written in worker threads, SQLite commits, JSON and compression would block the loop
+        if self.store is not None:
+            with trace_stage("store"):
+                match_data = await asyncio.to_thread(self.store.get_match, match_id)
+        if match_data is None:
+            match_data = await self.get_api_data(f"{self.regional_url}/tft/match/v1/matches/{match_id}")
+            if self.store is not None and match_data and isinstance(match_data, dict) and 'info' in match_data:
+                with trace_stage("store"):
+                    await asyncio.to_thread(lambda: self.store.save_match(match_data, json.dumps(match_data)))
+        return match_data
+
+    # Helper function to get a match reduced to the fields `CompactMatch` keeps, served from the match cache
+    # Always the reduced layout, cached or not: enough for format_analysis and participant_rows, use
+    # get_tft_match_data for any other field. Failed fetches are returned as they are.
+    async def get_tft_match_summary(self, match_id) -> dict:
+        if self.match_cache is not None:
+            match_data = self.match_cache.get(match_id)
+            if match_data is not None:
+                return match_data
+        match_data = await self.get_tft_match_data(match_id)
+        if not match_data or not isinstance(match_data, dict) or 'info' not in match_data:
+            return match_data
+        if self.match_cache is not None:
+            self.match_cache.put(match_data)
+            return self.match_cache.get(match_id)
+        return CompactMatch.pack(match_data).to_match_data()
 
     # Helper function to analyze a match
     async def analyze_tft_game(self, match_id) -> list[str]:
-        match_data = await self.get_tft_match_data(match_id)
-        if match_data and isinstance(match_data, dict) and 'info' in match_data:
-            participants = match_data['info'].get('participants', [])
-            analysis = []
-            for participant in participants:
-                player_name = participant.get('riotIdGameName', 'Unknown Player')
-                # Remove both 'TFT13_' and 'tft13_' prefixes
-                player_name = player_name.replace("TFT13_", "").replace("tft13_", "")
-                placement = participant.get('placement', 'N/A')
-                damage = participant.get('total_damage_to_players', 0)
-
-                # Build trait summary
-                traits = [f"{trait['name'].replace('TFT13_', '').replace('tft13_', '')} (Tier {trait['tier_current']}/{trait['tier_total']})" 
-                            for trait in participant.get('traits', [])]
-                trait_summary_text = "\n".join(traits) if traits else "No traits"
-
-                # Build unit summary
-                units = [f"{unit['character_id'].replace('TFT13_', '').replace('tft13_', '')} - Tier {unit['tier']}" 
-                            for unit in participant.get('units', [])]
-                unit_summary_text = "\n".join(units) if units else "No units"
-
-                # Prepare the analysis string
-                analysis.append(f"**Player**: {player_name}\n"
-                                f"**Placement**: **{placement}**\n"
-                                f"**Damage Dealt**: **{damage}**\n\n"
-                                f"**Traits**:\n{trait_summary_text}\n\n"
-                                f"**Units**:\n{unit_summary_text}\n")
-            return analysis
-        return ["Could not fetch game data for analysis."]
\ No newline at end of file
+        return format_analysis(await self.get_tft_match_summary(match_id))
+
+# Helper function to build the analysis pages of a match, one page per participant
+def format_analysis(match_data) -> list[str]:
+    if match_data and isinstance(match_data, dict) and 'info' in match_data:
+        participants = match_data['info'].get('participants', [])
+        analysis = []
+        for participant in participants:
+            player_name = participant.get('riotIdGameName', 'Unknown Player')
+            player_name = strip_set_prefix(player_name)
+            placement = participant.get('placement', 'N/A')
+            damage = participant.get('total_damage_to_players', 0)
+
+            # Build trait summary
+            traits = [f"{strip_set_prefix(trait['name'])} (Tier {trait['tier_current']}/{trait['tier_total']})"
+                        for trait in participant.get('traits', [])]
+            trait_summary_text = "\n".join(traits) if traits else "No traits"
+
+            # Build unit summary
+            units = [f"{strip_set_prefix(unit['character_id'])} - Tier {unit['tier']}"
+                        for unit in participant.get('units', [])]
+            unit_summary_text = "\n".join(units) if units else "No units"
+
+            # Prepare the analysis string
+            analysis.append(f"**Player**: {player_name}\n"
+                            f"**Placement**: **{placement}**\n"
+                            f"**Damage Dealt**: **{damage}**\n\n"
+                            f"**Traits**:\n{trait_summary_text}\n\n"
+                            f"**Units**:\n{unit_summary_text}\n")
+        return analysis
+    return ["Could not fetch game data for analysis."]
@@ -0,0 +1,257 @@
+import os
+import gc
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import itertools
+import tempfile
+import tracemalloc
+from collections import deque
+from typing import NamedTuple
+
+import TFTBot as tb
+from fake_riot import FakeRiotServer
+from match_store import MatchStore
+from riot_api import RiotAPI
+from compact_match import MatchCache
+
+
+def rss_bytes() -> int:
+    """
+    Returns the resident set size of the process, the peak resident set size where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, KiB elsewhere
+
+
+class FakeMessage():
+    """
+    Stands in for a `discord.Message`, keeping only the latest content and embed.
+    """
+    ids = itertools.count(1)
+
+    def __init__(self, content=None, embed=None):
+        self.id = next(self.ids)
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, content=None, embed=None):
+        self.content = content if content is not None else self.content
+        self.embed = embed if embed is not None else self.embed
+
+    async def delete(self):
+        pass
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def remove_reaction(self, emoji, user):
+        pass
+
+
+class FakeContext():
+    """
+    Stands in for a `commands.Context` of a direct message, the last sent message is kept under `sent`.
+    """
+    guild = None
+
+    def __init__(self):
+        self.sent: FakeMessage = None
+
+    async def send(self, content=None, embed=None, file=None) -> FakeMessage:
+        self.sent = FakeMessage(content, embed)
+        return self.sent
+
+
+class FakeReaction(NamedTuple):
+    message: FakeMessage
+    emoji: str
+
+
+class Sample(NamedTuple):
+    elapsed: float
+    rss: int
+    traced: int
+    commands: int
+
+
+class SoakResult(NamedTuple):
+    samples: list[Sample]
+    rss_growth: int
+    traced_growth: int
+    top_sites: list[str]
+    tracked_messages: int
+    cached_matches: int
+    passed: bool
+
+
+class SoakTest():
+    """
+    Drives the bot's `analyze`, `send_analysis_pages` and `on_reaction_add` with fake Discord objects
+    against a fake Riot server, and watches the process memory for growth.
+
+    Every iteration rotates a random player's match history so the analyzed match changes, analyzes
+    that player and flips pages of recently sent analyses. Memory is sampled every `interval` seconds.
+    Growth is measured from the end of the warmup, once the match store, the caches and MAN_MSG are
+    full, to the end of the run. The run fails if either the RSS or the memory traced by `tracemalloc`
+    grew by more than the allowed amount. The bot's globals are restored afterwards.
+
+    Args:
+        duration (float): Seconds of simulated traffic.
+        interval (float): Seconds between memory samples.
+        warmup (float): Seconds of traffic before the baseline is taken.
+        max_rss_growth (int): Allowed RSS growth in bytes.
+        max_traced_growth (int): Allowed growth of the memory traced by tracemalloc in bytes.
+        matches (int): Number of matches the fake Riot server serves.
+        players (int): Number of players per ladder tier of the fake Riot server.
+        cache_size (int): Size of the bot's match cache.
+        reactions (int): Page flips per analysis.
+        top (int): Number of allocation sites in the report.
+        frames (int): Frames stored per traced allocation, every frame slows the traffic down further.
+    """
+
+    def __init__(self, duration=3600.0, interval=60.0, warmup=300.0, max_rss_growth=32 * 1024 * 1024,
+                 max_traced_growth=8 * 1024 * 1024, matches=2000, players=100, cache_size=1024, reactions=4, top=15, frames=1):
+        self.duration = duration
+        self.interval = interval
+        self.warmup = warmup
+        self.max_rss_growth = max_rss_growth
+        self.max_traced_growth = max_traced_growth
+        self.server = FakeRiotServer(players_per_tier=players, matches=matches)
+        self.cache_size = cache_size
+        self.reactions = reactions
+        self.top = top
+        self.frames = frames
+        self.rnd = random.Random(0)
+        self.commands = 0
+
+    def sample(self, started) -> Sample:
+        gc.collect()
+        return Sample(time.perf_counter() - started, rss_bytes(), tracemalloc.get_traced_memory()[0], self.commands)
+
+    async def traffic(self, stop: asyncio.Event):
+        """
+        Sends commands and reactions until `stop` is set.
+        """
+        puuids = sorted(self.server.players)
+        recent: deque[FakeMessage] = deque(maxlen=50)
+        user = object()
+        while not stop.is_set():
+            puuid = self.rnd.choice(puuids)
+            history = self.server.history[puuid]
+            if history:
+                history.append(history.pop(0))
+            player = self.server.players[puuid]
+
+            ctx = FakeContext()
+            await tb.analyze.callback(ctx, f"{player['gameName']}/{player['tagLine']}")
+            recent.append(ctx.sent)
+            self.commands += 1
+
+            for _ in range(self.reactions):
+                message = self.rnd.choice(recent)
+                await tb.on_reaction_add(FakeReaction(message, self.rnd.choice(["⬅️", "➡️"])), user)
+                self.commands += 1
+            await asyncio.sleep(0)  # Let the fake Riot server and the sampler run
+
+    async def run(self) -> SoakResult:
+        url = await self.server.start()
+        with tempfile.TemporaryDirectory(prefix="tftbot-soak-") as directory:
+            store = MatchStore(os.path.join(directory, "matches.db"))
+            riot_api = RiotAPI("fake-key", base_url=url, rate_limits=((100000, 1.0),), store=store,
+                               match_cache=MatchCache(self.cache_size))
+            previous = tb.RIOT_API, tb.MATCH_STORE, tb.MAN_MSG, list(tb.MAN_MSG_ORDER)
+            tb.RIOT_API, tb.MATCH_STORE = riot_api, store
+            tb.initialize_shared_state({})
+
+            stop = asyncio.Event()
+            task = asyncio.create_task(self.traffic(stop))
+            tracemalloc.start(self.frames)
+            try:
+                started = time.perf_counter()
+                await asyncio.sleep(self.warmup)
+                baseline = self.sample(started)
+                baseline_snapshot = tracemalloc.take_snapshot()
+                samples = [baseline]
+                logging.info(f"Warmup done after {baseline.commands} commands: RSS {baseline.rss / 2**20:.1f} MiB")
+                while time.perf_counter() - started < self.duration:
+                    await asyncio.sleep(min(self.interval, max(self.duration - (time.perf_counter() - started), 0)))
+                    if task.done():
+                        break
+                    samples.append(self.sample(started))
+                    logging.info(f"{samples[-1].elapsed:.0f}s, {samples[-1].commands} commands: RSS {samples[-1].rss / 2**20:.1f} MiB, "
+                                 f"traced {samples[-1].traced / 2**20:.1f} MiB")
+                stop.set()
+                await task  # Raises if the traffic failed
+                snapshot = tracemalloc.take_snapshot()
+                tracked_messages, cached_matches = len(tb.MAN_MSG), len(riot_api.match_cache)
+            finally:
+                stop.set()
+                tracemalloc.stop()
+                tb.RIOT_API, tb.MATCH_STORE, man_msg, man_msg_order = previous
+                tb.initialize_shared_state(man_msg)
+                tb.MAN_MSG_ORDER.extend(man_msg_order)
+                await riot_api.close()
+                await self.server.stop()
+                store.close()
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+        top_sites = [str(stat) for stat in snapshot.filter_traces(filters).compare_to(
+            baseline_snapshot.filter_traces(filters), "lineno")[:self.top]]
+        rss_growth = samples[-1].rss - baseline.rss
+        traced_growth = samples[-1].traced - baseline.traced
+        passed = rss_growth <= self.max_rss_growth and traced_growth <= self.max_traced_growth
+        return SoakResult(samples, rss_growth, traced_growth, top_sites, tracked_messages, cached_matches, passed)
+
+
+def format_report(result: SoakResult) -> str:
+    first, last = result.samples[0], result.samples[-1]
+    hours = (last.elapsed - first.elapsed) / 3600
+    lines = [
+        f"{'PASSED' if result.passed else 'FAILED'}: {last.commands - first.commands} commands "
+        f"in {last.elapsed - first.elapsed:.0f}s after the warmup",
+        f"RSS {first.rss / 2**20:.1f} -> {last.rss / 2**20:.1f} MiB ({result.rss_growth / 2**20:+.2f} MiB"
+        + (f", {result.rss_growth / 2**20 / hours:+.2f} MiB/h)" if hours else ")"),
+        f"Traced {first.traced / 2**20:.1f} -> {last.traced / 2**20:.1f} MiB ({result.traced_growth / 2**20:+.2f} MiB)",
+        f"Tracked messages: {result.tracked_messages}, cached matches: {result.cached_matches}",
+        "",
+        "Top allocation sites by growth:",
+        *result.top_sites,
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test the bot with simulated traffic and fail on memory growth")
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds of simulated traffic")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between memory samples")
+    parser.add_argument("--warmup", type=float, default=300, help="Seconds of traffic before the baseline is taken")
+    parser.add_argument("--max-rss-growth", type=float, default=32, help="Allowed RSS growth in MiB")
+    parser.add_argument("--max-traced-growth", type=float, default=8, help="Allowed growth of Python allocations in MiB")
+    parser.add_argument("--matches", type=int, default=2000, help="Number of matches the fake Riot server serves")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Size of the match cache")
+    parser.add_argument("--top", type=int, default=15, help="Number of allocation sites in the report")
+    parser.add_argument("--frames", type=int, default=1, help="Frames stored per traced allocation")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for name in ("aiohttp.access", "discord"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    logging.getLogger().handlers[0].addFilter(lambda record: not record.getMessage().startswith("MAN_MSG updated"))
+
+    soak = SoakTest(args.duration, args.interval, args.warmup, int(args.max_rss_growth * 2**20),
+                    int(args.max_traced_growth * 2**20), matches=args.matches, cache_size=args.cache_size, top=args.top, frames=args.frames)
+    result = asyncio.run(soak.run())
+    print(format_report(result))
+    sys.exit(0 if result.passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import board_render
+from board_render import BoardRenderer, URL_TTL
+from fake_riot import FakeRiotServer
+from match_store import participant_rows
+
+pytestmark = pytest.mark.skipif(board_render.Image is None, reason="Pillow is not installed")
+
+
+class FakeChannel():
+    """
+    Stands in for the board channel, every upload gets a new attachment URL.
+    """
+
+    def __init__(self):
+        self.uploads = 0
+
+    async def send(self, file=None):
+        self.uploads += 1
+        await asyncio.sleep(0.01)  # Lets concurrent requests overlap with the upload
+        return SimpleNamespace(attachments=[SimpleNamespace(url=f"https://cdn.example/{self.uploads}/{file.filename}")])
+
+
+@pytest.fixture
+def board():
+    """
+    Returns the match ID and the first participant row of a generated match.
+    """
+    match_data = next(iter(FakeRiotServer(matches=1).matches.values()))
+    return match_data['metadata']['match_id'], participant_rows(match_data)[0]
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    renderer = BoardRenderer(str(tmp_path / "assets"), str(tmp_path / "cache"))
+    yield renderer
+    renderer.close()
+
+
+def test_render_caches_png(renderer: BoardRenderer, board, tmp_path, monkeypatch):
+    """
+    Tests that a rendered board is written to the cache directory as PNG and not drawn again.
+    """
+    match_id, row = board
+    path = asyncio.run(renderer.render(match_id, row))
+
+    assert path.startswith(str(tmp_path / "cache"))
+    with open(path, "rb") as f:
+        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+
+    monkeypatch.setattr(renderer, "draw", lambda board: pytest.fail("cached board drawn again"))
+    assert asyncio.run(renderer.render(match_id, row)) == path
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+
+def test_image_url_uploads_once(renderer: BoardRenderer, board):
+    """
+    Tests that concurrent requests share one upload and the remembered URL is reused afterwards.
+    """
+    match_id, row = board
+    channel = FakeChannel()
+
+    async def request_twice():
+        first = await asyncio.gather(renderer.image_url(match_id, row, channel), renderer.image_url(match_id, row, channel))
+        return first, await renderer.image_url(match_id, row, channel)
+
+    (first, second), third = asyncio.run(request_twice())
+
+    assert channel.uploads == 1
+    assert first == second == third
+
+
+def test_image_url_reuploads_expired(renderer: BoardRenderer, board, monkeypatch):
+    """
+    Tests that a board is uploaded again once its attachment URL expired.
+    """
+    match_id, row = board
+    channel = FakeChannel()
+    first = asyncio.run(renderer.image_url(match_id, row, channel))
+
+    now = board_render.time.time()
+    monkeypatch.setattr(board_render.time, "time", lambda: now + URL_TTL + 1)
+    second = asyncio.run(renderer.image_url(match_id, row, channel))
+
+    assert channel.uploads == 2
+    assert second != first
@@ -0,0 +1,88 @@
+import json
+import asyncio
+
+import pytest
+
+from fake_riot import FakeRiotServer
+from riot_api import format_analysis
+from match_store import MatchStore, participant_rows, TRAIN_AFTER, DICTIONARY
+from compact_match import CompactMatch, MatchCache, BlobCodec, zstandard
+
+
+def test_pack_round_trip():
+    """
+    Tests that a packed match yields the same analysis pages and participant rows as the full match.
+    """
+    server = FakeRiotServer(matches=10)
+    for match_data in server.matches.values():
+        unpacked = CompactMatch.pack(match_data).to_match_data()
+        assert format_analysis(unpacked) == format_analysis(match_data)
+        assert participant_rows(unpacked) == participant_rows(match_data)
+
+
+def test_match_cache_memory_report():
+    """
+    Tests that the cache stays bounded and packed matches take a fraction of the memory of the JSON dictionaries.
+    """
+    server = FakeRiotServer(matches=40)
+    cache = MatchCache(maxsize=20)
+    for match_data in server.matches.values():
+        cache.put(json.loads(json.dumps(match_data)))
+
+    report = cache.memory_report()
+    assert len(cache) == report["matches"] == 20
+    assert report["bytes_per_match"] * 5 < report["unpacked_bytes_per_match"]
+    assert next(iter(server.matches)) not in cache
+
+
+def test_blob_codec_round_trip():
+    """
+    Tests that raw match bodies survive compression with a trained dictionary.
+    """
+    server = FakeRiotServer(matches=100)
+    blobs = [json.dumps(match_data).encode("utf-8") for match_data in server.matches.values()]
+    codec = BlobCodec(BlobCodec.train(blobs[:80]))
+    for raw in blobs[80:]:
+        assert codec.decompress(codec.compress(raw)) == raw
+
+
+def test_riot_api_serves_cached_matches(fake_riot):
+    """
+    Tests that a cached match is not fetched again and has the same layout on a miss and on a hit.
+    """
+    server = FakeRiotServer(matches=10)
+    match_id = next(iter(server.matches))
+
+    async def fetch_twice():
+        async with fake_riot(server, match_cache=MatchCache()) as riot_api:
+            return await riot_api.get_tft_match_summary(match_id), await riot_api.get_tft_match_summary(match_id)
+
+    first, second = asyncio.run(fetch_twice())
+    assert server.requests["match"] == 1
+    assert second == first
+    assert format_analysis(second) == format_analysis(first)
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_store_compresses_with_trained_dictionary(tmp_path):
+    """
+    Tests that a compressing store trains a dictionary once it holds enough matches and reads back every body.
+    """
+    path = str(tmp_path / "matches.db")
+    matches = list(FakeRiotServer(matches=TRAIN_AFTER + 20).matches.values())
+    store = MatchStore(path, compress=True)
+    for match_data in matches[:TRAIN_AFTER]:
+        store.save_match(match_data, json.dumps(match_data))
+    store.close()
+
+    store = MatchStore(path, compress=True)
+    assert store.codecs[DICTIONARY] is not None
+    for match_data in matches[TRAIN_AFTER:]:
+        store.save_match(match_data, json.dumps(match_data))
+    data = store.conn.execute("SELECT data FROM matches WHERE match_id = ?", (matches[-1]['metadata']['match_id'],)).fetchone()[0]
+    assert data[0] == DICTIONARY and len(data) < len(json.dumps(matches[-1])) / 5
+    store.close()
+
+    store = MatchStore(path)  # Reading does not depend on compress
+    assert all(store.get_match(match_data['metadata']['match_id']) == match_data for match_data in matches)
+    store.close()
@@ -0,0 +1,128 @@
+import os
+import csv
+import json
+import asyncio
+
+import pytest
+
+from fake_riot import FakeRiotServer
+from match_store import MatchStore
+from riot_api import RiotAPI
+import export
+from export import export_history, PARQUET_AVAILABLE
+
+
+@pytest.fixture
+def run_export(fake_riot):
+    """
+    Returns a function exporting the history of the first challenger player of the fake Riot server.
+    """
+    async def run(server: FakeRiotServer, directory, fmt, count, store=None, max_bytes=10 * 1024 * 1024):
+        async with fake_riot(server, store=store) as riot_api:
+            return await export_history(riot_api, "puuid-challenger-0", count, fmt, str(directory), "export", max_bytes, chunk_size=16)
+
+    return run
+
+
+def test_export_csv(tmp_path, run_export):
+    """
+    Tests that every participant of the exported matches becomes one CSV row, newest match first.
+    """
+    server = FakeRiotServer(matches=40)
+    history = server.history["puuid-challenger-0"][:5]
+    result = asyncio.run(run_export(server, tmp_path, "csv", 5))
+    paths = result.paths
+
+    assert len(paths) == 1
+    assert (result.matches, result.rows) == (5, 5 * 8)
+    with open(paths[0], newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 5 * 8
+    assert [row["match_id"] for row in rows[::8]] == history
+    assert isinstance(json.loads(rows[0]["units"]), list)
+
+
+def test_export_splits_parts(tmp_path, run_export):
+    """
+    Tests that an export exceeding the size limit is split into parts below the limit that hold every row.
+    """
+    paths = asyncio.run(run_export(FakeRiotServer(matches=40), tmp_path, "ndjson", 10, max_bytes=8 * 1024)).paths
+
+    assert len(paths) > 1
+    rows = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        assert len(data) <= 8 * 1024
+        rows += data.count(b"\n")
+    assert rows == 10 * 8
+
+
+def test_export_reuses_stored_matches(tmp_path, run_export):
+    """
+    Tests that stored matches are not fetched again.
+    """
+    store = MatchStore(":memory:")
+    asyncio.run(run_export(FakeRiotServer(matches=40), tmp_path / "first", "csv", 5, store=store))
+
+    server = FakeRiotServer(matches=40)
+    asyncio.run(run_export(server, tmp_path / "second", "csv", 5, store=store))
+    store.close()
+
+    assert server.requests["match"] == 0
+
+
+def test_failed_write_cancels_prefetched_matches(tmp_path, monkeypatch, run_export):
+    """
+    Tests that no match fetch is left running after a write fails.
+    """
+    class FailingWriter(export.CSVWriter):
+        def write(self, rows):
+            raise OSError("disk full")
+
+    fetch = RiotAPI.get_tft_match_summary
+    fetched = []
+
+    async def slow_fetch(self, match_id):
+        # Later matches are still being fetched when the first write fails
+        fetched.append(match_id)
+        if len(fetched) > 2:
+            await asyncio.sleep(60)
+        return await fetch(self, match_id)
+
+    monkeypatch.setitem(export.WRITERS, "csv", FailingWriter)
+    monkeypatch.setattr(RiotAPI, "get_tft_match_summary", slow_fetch)
+
+    async def export_failing():
+        with pytest.raises(OSError):
+            await run_export(FakeRiotServer(matches=40), tmp_path, "csv", 20)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(export_failing()) == []
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow is not installed")
+def test_export_parquet(tmp_path, run_export):
+    """
+    Tests that parquet exports hold every row.
+    """
+    import pyarrow.parquet
+
+    paths = asyncio.run(run_export(FakeRiotServer(matches=40), tmp_path, "parquet", 5)).paths
+
+    assert sum(pyarrow.parquet.read_table(path).num_rows for path in paths) == 5 * 8
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow is not installed")
+def test_export_parquet_splits_parts(tmp_path, run_export):
+    """
+    Tests that a parquet export exceeding the size limit is split into valid parts below the limit that hold every row.
+    """
+    import pyarrow.parquet
+
+    paths = asyncio.run(run_export(FakeRiotServer(matches=40), tmp_path, "parquet", 10, max_bytes=8 * 1024)).paths
+
+    assert len(paths) > 1
+    for path in paths:
+        assert os.path.getsize(path) <= 8 * 1024
+    assert sum(pyarrow.parquet.read_table(path).num_rows for path in paths) == 10 * 8
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from fake_riot import FakeRiotServer
+from match_store import MatchStore
+from meta_stats import MetaStats
+from http_api import HTTPAPI
+
+
+@pytest.fixture
+def with_http_api(fake_riot):
+    """
+    Returns a function running a coroutine function with an HTTP API client, the API shares one RiotAPI pointed at the fake Riot server.
+    """
+    async def run(server: FakeRiotServer, test, store: MatchStore = None):
+        store = store or MatchStore(":memory:")
+        meta_stats = MetaStats(min_games=1)
+        meta_stats.load(store)
+        try:
+            async with fake_riot(server, store=store) as riot_api:
+                client = TestClient(TestServer(HTTPAPI(riot_api, meta_stats).app))
+                await client.start_server()
+                try:
+                    return await test(client)
+                finally:
+                    await client.close()
+        finally:
+            store.close()
+
+    return run
+
+
+def test_match_analysis_etag(with_http_api):
+    """
+    Tests that match analyses carry an ETag and conditional requests are answered without a Riot API request.
+    """
+    server = FakeRiotServer()
+    match_id = next(iter(server.matches))
+
+    async def test(client: TestClient):
+        response = await client.get(f"/match/{match_id}/analysis", headers={"Accept-Encoding": "gzip"})
+        assert response.status == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "immutable" in response.headers["Cache-Control"]
+        data = await response.json()
+        assert len(data["participants"]) == len(data["pages"]) == 8
+
+        requests = sum(server.requests.values())
+        response = await client.get(f"/match/{match_id}/analysis", headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status == 304
+        assert sum(server.requests.values()) == requests
+
+        response = await client.get("/match/NA1_1/analysis")
+        assert response.status == 404
+
+    asyncio.run(with_http_api(server, test))
+
+
+def test_summoner_latest_and_history(with_http_api):
+    """
+    Tests the latest match and history aggregates of a summoner, and that fetched matches only reach the meta tables once ingested.
+    """
+    server = FakeRiotServer(matches=40)
+    history = server.history["puuid-challenger-0"]
+    store = MatchStore(":memory:")
+
+    async def test(client: TestClient):
+        response = await client.get("/summoner/Challenger0%23NA1/latest")
+        assert response.status == 200
+        assert (await response.json())["match_id"] == history[0]
+        etag = response.headers["ETag"]
+        response = await client.get("/summoner/Challenger0%23NA1/latest", headers={"If-None-Match": etag})
+        assert response.status == 304
+        response = await client.get(f"/match/{history[0]}/analysis", headers={"If-None-Match": etag})
+        assert response.status == 200
+        assert response.headers["ETag"] != etag
+
+        response = await client.get("/summoner/Challenger0-NA1/history", params={"count": "5"})
+        data = await response.json()
+        assert data["games"] == 5
+        assert data["match_ids"] == history[:5]
+        assert 1 <= data["avg_placement"] <= 8
+
+        assert store.mark_ingested(history[:5]) == 5
+        response = await client.get("/meta/units")
+        assert len(await response.json()) > 0
+
+        response = await client.get("/summoner/Unknown%23NA1/latest")
+        assert response.status == 404
+
+    asyncio.run(with_http_api(server, test, store))
+
+
+def test_healthz_readiness(fake_riot):
+    """
+    Tests that /healthz reports unavailable until the bot sets its readiness, and /meta is unavailable until the meta statistics are loaded.
+    """
+    server = FakeRiotServer()
+
+    async def test():
+        async with fake_riot(server) as riot_api:
+            http_api = HTTPAPI(riot_api)
+            client = TestClient(TestServer(http_api.app))
+            await client.start_server()
+            try:
+                await riot_api.warmup()
+                response = await client.get("/healthz")
+                assert response.status == 503
+
+                http_api.readiness = {"time_to_ready": 1.5}
+                response = await client.get("/healthz")
+                assert response.status == 200
+                assert (await response.json()) == {"ready": True, "time_to_ready": 1.5}
+
+                response = await client.get("/meta/units")
+                assert response.status == 503
+                assert response.headers["Retry-After"] == "5"
+                response = await client.get("/meta/unknown")
+                assert response.status == 404
+            finally:
+                await client.close()
+
+    asyncio.run(test())
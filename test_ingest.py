@@ -0,0 +1,143 @@
+import json
+import asyncio
+
+import pytest
+
+from fake_riot import FakeRiotServer
+from match_store import MatchStore, SOURCE_INGEST
+from ingest import LadderIngestor
+
+
+@pytest.fixture
+def run_ingestion(fake_riot):
+    """
+    Returns a function running a ladder ingestion against the fake Riot server and returning the final progress.
+    """
+    async def run(server: FakeRiotServer, store: MatchStore, **kwargs):
+        async with fake_riot(server, store=store) as riot_api:
+            return await LadderIngestor(riot_api, store, workers=2, **kwargs).run()
+
+    return run
+
+
+@pytest.fixture
+def store():
+    """
+    Returns an in-memory match store that is closed after the test.
+    """
+    store = MatchStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_ingest_dedupes_matches(store: MatchStore, run_ingestion):
+    """
+    Tests that every distinct ladder match is fetched exactly once even though match IDs overlap between players.
+    """
+    server = FakeRiotServer(players_per_tier=10, matches=30)
+    progress = asyncio.run(run_ingestion(server, store, tiers=["challenger", "grandmaster"], matches_per_player=100))
+
+    assert progress.players_total == 20
+    assert progress.matches_total == 30
+    assert store.count() == 30
+    assert server.requests["match"] == 30
+    assert len(list(store.iter_participants())) == 30 * 8
+
+
+def test_ingest_skips_stored_matches(store: MatchStore, run_ingestion):
+    """
+    Tests that a second ingestion does not refetch matches that are already stored.
+    """
+    asyncio.run(run_ingestion(FakeRiotServer(matches=20), store, tiers=["challenger"], matches_per_player=100))
+    stored = store.count()
+
+    server = FakeRiotServer(matches=20)
+    asyncio.run(run_ingestion(server, store, tiers=["challenger"], matches_per_player=100))
+
+    assert store.count() == stored
+    assert server.requests["match"] == 0
+
+
+def test_ingest_resumes_from_checkpoint(store: MatchStore, run_ingestion, tmp_path):
+    """
+    Tests that players recorded in the checkpoint are not expanded again and pending matches are still fetched.
+    """
+    server = FakeRiotServer(players_per_tier=4, matches=10)
+    done = ["puuid-challenger-0", "puuid-challenger-1"]
+    pending = server.history["puuid-challenger-0"]
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"tiers": ["challenger"], "players_done": done, "pending": pending}))
+
+    progress = asyncio.run(run_ingestion(server, store, tiers=["challenger"], matches_per_player=100,
+                                         checkpoint_path=str(checkpoint)))
+
+    assert server.requests["match_ids"] == 2
+    assert progress.players_done == 4
+    for match_id in pending:
+        assert store.has_match(match_id)
+    assert not checkpoint.exists()
+
+
+def test_ingest_reruns_pick_up_new_matches(store: MatchStore, run_ingestion, tmp_path):
+    """
+    Tests that a finished ingestion removes its checkpoint, so the next run expands every player again.
+    """
+    checkpoint = tmp_path / "checkpoint.json"
+    asyncio.run(run_ingestion(FakeRiotServer(matches=20), store, tiers=["challenger"], matches_per_player=100,
+                              checkpoint_path=str(checkpoint)))
+    assert not checkpoint.exists()
+    stored = store.count()
+
+    server = FakeRiotServer(matches=40)
+    asyncio.run(run_ingestion(server, store, tiers=["challenger"], matches_per_player=100, checkpoint_path=str(checkpoint)))
+
+    assert server.requests["match_ids"] == 10
+    assert store.count() == 40 > stored
+    assert not checkpoint.exists()
+
+
+def test_ingest_retries_failed_matches(store: MatchStore, run_ingestion, tmp_path):
+    """
+    Tests that a match that could not be fetched stays in the checkpoint and is stored by the resumed run.
+    """
+    checkpoint = tmp_path / "checkpoint.json"
+    server = FakeRiotServer(matches=20)
+    missing = next(iter(server.matches))
+    match_data = server.matches.pop(missing)
+    asyncio.run(run_ingestion(server, store, tiers=["challenger"], matches_per_player=100, checkpoint_path=str(checkpoint)))
+
+    assert not store.has_match(missing)
+    assert json.loads(checkpoint.read_text())["pending"] == [missing]
+
+    server = FakeRiotServer(matches=20)
+    asyncio.run(run_ingestion(server, store, tiers=["challenger"], matches_per_player=100, checkpoint_path=str(checkpoint)))
+
+    assert server.requests["match"] == 1
+    assert store.has_match(missing)
+    assert server.matches[missing] == match_data
+    assert not checkpoint.exists()
+
+
+def test_ingest_ignores_checkpoint_of_other_tiers(store: MatchStore, run_ingestion, tmp_path):
+    """
+    Tests that a checkpoint of different tiers does not skip any player.
+    """
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"tiers": ["grandmaster"], "players_done": ["puuid-challenger-0"], "pending": []}))
+    server = FakeRiotServer(players_per_tier=4, matches=10)
+    asyncio.run(run_ingestion(server, store, tiers=["challenger"], matches_per_player=100, checkpoint_path=str(checkpoint)))
+
+    assert server.requests["match_ids"] == 4
+
+
+def test_ingest_marks_adhoc_matches(store: MatchStore, run_ingestion):
+    """
+    Tests that ladder matches stored by an ad-hoc lookup are marked as ingested without being fetched again.
+    """
+    server = FakeRiotServer(matches=20)
+    for match_data in list(server.matches.values())[:5]:
+        store.save_match(match_data, json.dumps(match_data))
+    asyncio.run(run_ingestion(server, store, tiers=["challenger"], matches_per_player=100))
+
+    assert server.requests["match"] == 15
+    assert store.known_match_ids(SOURCE_INGEST) == set(server.matches)
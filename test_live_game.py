@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from fake_riot import FakeRiotServer
+from riot_api import RiotAPI, NOT_FOUND
+from live_game import lobby_stats, format_live
+
+
+@pytest.fixture
+def with_fake_riot(fake_riot):
+    """
+    Returns a function running a coroutine function against a RiotAPI pointed at the fake Riot server.
+    """
+    async def run(server: FakeRiotServer, test, **kwargs):
+        async with fake_riot(server, **kwargs) as riot_api:
+            return await test(riot_api)
+
+    return run
+
+
+def test_not_in_game_is_cached(with_fake_riot):
+    """
+    Tests that a "not in game" answer is cached and not requested again.
+    """
+    server = FakeRiotServer()
+
+    async def test(riot_api: RiotAPI):
+        assert await riot_api.get_active_game("puuid-challenger-0") is NOT_FOUND
+        assert await riot_api.get_active_game("puuid-challenger-0") is NOT_FOUND
+
+    asyncio.run(with_fake_riot(server, test))
+    assert server.requests["active_game"] == 1
+
+
+def test_lobby_stats(with_fake_riot):
+    """
+    Tests that the recent placements of every lobby participant are fetched and cached.
+    """
+    server = FakeRiotServer(matches=20)
+    lobby = sorted(server.players)[:8]
+    server.start_game(lobby, game_length=754)
+
+    async def test(riot_api: RiotAPI):
+        game = await riot_api.get_active_game(lobby[0])
+        players = await lobby_stats(riot_api, game, recent=3)
+        assert [player.puuid for player in players] == lobby
+        for player in players:
+            expected = [next(p['placement'] for p in server.matches[match_id]['info']['participants'] if p['puuid'] == player.puuid)
+                        for match_id in server.history[player.puuid][:3]]
+            assert player.placements == expected
+        assert "12:34" in format_live(game, players)
+
+        requests = sum(server.requests.values())
+        await lobby_stats(riot_api, game, recent=3)
+        assert sum(server.requests.values()) == requests
+
+    asyncio.run(with_fake_riot(server, test))
+
+
+def test_lobby_stats_respects_rate_budget(with_fake_riot):
+    """
+    Tests that lobby stats are skipped when the remaining rate budget cannot cover them.
+    """
+    server = FakeRiotServer()
+    lobby = sorted(server.players)[:8]
+    server.start_game(lobby)
+
+    async def test(riot_api: RiotAPI):
+        game = await riot_api.get_active_game(lobby[0])
+        players = await lobby_stats(riot_api, game)
+        assert all(player.placements is None for player in players)
+        assert "stats skipped" in format_live(game, players)
+
+    asyncio.run(with_fake_riot(server, test, rate_limits=((20, 1.0), (30, 120.0))))
+    assert server.requests["match_ids"] == 0
+
+
+def test_failed_history_is_not_cached(with_fake_riot):
+    """
+    Tests that recent placements are not cached when the match history request failed.
+    """
+    server = FakeRiotServer(matches=20)
+    puuid = sorted(server.players)[0]
+    history = server.history.pop(puuid)
+
+    async def test(riot_api: RiotAPI):
+        assert await riot_api.get_recent_placements(puuid, count=3) == []
+        server.history[puuid] = history
+        assert len(await riot_api.get_recent_placements(puuid, count=3)) == 3
+        assert len(await riot_api.get_recent_placements(puuid, count=3)) == 3
+
+    asyncio.run(with_fake_riot(server, test))
+    assert server.requests["match_ids"] == 2
@@ -0,0 +1,153 @@
+import threading
+
+import numpy as np
+
+from fake_riot import FakeRiotServer
+from match_store import MatchStore, participant_rows, SOURCE_INGEST
+from meta_stats import MetaStats, jaccard
+
+
+def board(placement, traits, units):
+    """
+    Builds a participant row with the given active traits and units.
+    """
+    return {"match_id": "NA1_1", "placement": placement, "traits": [[trait, 1, 2] for trait in traits],
+            "units": [[unit, 1, []] for unit in units]}
+
+
+def test_jaccard_matches_set_similarity():
+    """
+    Tests that the bit-packed Jaccard similarity equals the set based one.
+    """
+    a = np.zeros((1, 4), dtype=np.uint64)
+    b = np.zeros((1, 4), dtype=np.uint64)
+    for bit in (1, 5, 70, 200):
+        a[0, bit // 64] |= np.uint64(1 << (bit % 64))
+    for bit in (5, 70, 130):
+        b[0, bit // 64] |= np.uint64(1 << (bit % 64))
+
+    assert jaccard(a, b)[0, 0] == np.float32(2 / 5)
+
+
+def test_tables_are_incremental_and_cached():
+    """
+    Tests that placements are aggregated per unit and the cached table is only recomputed after new boards arrive.
+    """
+    meta = MetaStats(min_games=1, refresh_interval=3600)
+    meta.add_rows([board(1, ["Rebel"], ["Jinx"]), board(6, ["Rebel"], ["Jinx", "Vi"])])
+
+    units = {row.key: row for row in meta.table("units")}
+    assert units["Jinx"].games == 2
+    assert units["Jinx"].avg_placement == 3.5
+    assert units["Jinx"].top4_rate == 0.5
+    assert meta.table("units") is meta.table("units")
+
+    meta.add_rows([board(2, [], ["Vi"])])
+    stale = meta.table("units")
+    assert {row.key: row for row in stale}["Vi"].games == 1  # Served from the cache within the refresh interval
+    assert {row.key: row for row in meta.table("units", force=True)}["Vi"].games == 2
+
+
+def test_duplicate_units_and_items_count_once():
+    """
+    Tests that a board with two copies of a unit or item counts as one game of it.
+    """
+    meta = MetaStats(min_games=1)
+    meta.add_rows([
+        {"match_id": "NA1_1", "placement": 8, "traits": [],
+         "units": [["Jinx", 1, ["InfinityEdge"]], ["Jinx", 2, ["InfinityEdge", "Bloodthirster"]]]},
+        {"match_id": "NA1_1", "placement": 1, "traits": [], "units": [["Jinx", 1, ["InfinityEdge"]]]},
+    ])
+
+    units = {row.key: row for row in meta.table("units")}
+    items = {row.key: row for row in meta.table("items")}
+    assert (units["Jinx"].games, units["Jinx"].avg_placement) == (2, 4.5)
+    assert (items["InfinityEdge"].games, items["InfinityEdge"].avg_placement) == (2, 4.5)
+    assert items["Bloodthirster"].games == 1
+
+
+def test_comps_separate_distinct_boards():
+    """
+    Tests that two disjoint groups of boards are clustered into two comps.
+    """
+    meta = MetaStats(clusters=2, min_games=1)
+    meta.add_rows([board(1, ["Rebel"], ["Jinx", "Ekko", "Zeri"]) for _ in range(20)])
+    meta.add_rows([board(8, ["Bruiser"], ["Vi", "Sett", "Warwick"]) for _ in range(20)])
+
+    comps = meta.table("comps")
+    assert [comp.games for comp in comps] == [20, 20]
+    assert comps[0].key == "Rebel: Jinx, Ekko, Zeri"
+    assert comps[0].avg_placement == 1.0
+
+
+def test_add_rows_does_not_wait_for_clustering():
+    """
+    Tests that boards can be added, e.g. by the match store listener, while comps are being clustered.
+    """
+    started, release = threading.Event(), threading.Event()
+
+    class SlowMetaStats(MetaStats):
+        @staticmethod
+        def cluster(boards, centroids, iterations):
+            started.set()
+            release.wait(5)
+            return MetaStats.cluster(boards, centroids, iterations)
+
+    meta = SlowMetaStats(clusters=1, min_games=1)
+    meta.add_rows([board(1, ["Rebel"], ["Jinx"]) for _ in range(10)])
+    clustering = threading.Thread(target=meta.table, args=("comps",))
+    clustering.start()
+    assert started.wait(5)
+
+    meta.add_rows([board(8, ["Bruiser"], ["Vi", "Sett", "Warwick", "Zac", "Rell"]) for _ in range(100)])
+    assert clustering.is_alive()
+    release.set()
+    clustering.join()
+
+    assert meta.table("comps")[0].games == 10  # Clustered on the snapshot
+    assert meta.table("comps", force=True)[0].games == 110
+
+
+def test_load_counts_every_stored_board_once():
+    """
+    Tests that loading from the store and the store listener together count every board exactly once.
+    """
+    server = FakeRiotServer(matches=10)
+    store = MatchStore(":memory:")
+    matches = list(server.matches.values())
+    for match_data in matches[:5]:
+        store.save_match(match_data, "{}", SOURCE_INGEST)
+
+    meta = MetaStats(min_games=1)
+    meta.load(store)
+    for match_data in matches[5:]:
+        store.save_match(match_data, "{}", SOURCE_INGEST)
+    store.close()
+
+    assert meta.size == sum(len(participant_rows(match_data)) for match_data in matches)
+
+
+def test_load_skips_adhoc_matches_until_ingested():
+    """
+    Tests that matches looked up ad-hoc are left out of the statistics and counted once when the ingestion marks them.
+    """
+    server = FakeRiotServer(matches=10)
+    store = MatchStore(":memory:")
+    matches = list(server.matches.values())
+    for match_data in matches[:4]:
+        store.save_match(match_data, "{}", SOURCE_INGEST)
+    for match_data in matches[4:8]:
+        store.save_match(match_data, "{}")
+
+    meta = MetaStats(min_games=1)
+    meta.load(store)
+    assert meta.size == sum(len(participant_rows(match_data)) for match_data in matches[:4])
+
+    store.save_match(matches[8], "{}")
+    assert store.mark_ingested([match_data['metadata']['match_id'] for match_data in matches[:6]]) == 2
+    assert meta.size == sum(len(participant_rows(match_data)) for match_data in matches[:6])
+
+    reloaded = MetaStats(min_games=1)
+    reloaded.load(store)
+    store.close()
+    assert reloaded.size == meta.size
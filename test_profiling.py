@@ -0,0 +1,98 @@
+import sys
+import json
+import types
+import time
+import pstats
+import asyncio
+import itertools
+import threading
+
+from profiling import Profiler, SamplingProfiler, trace_stage
+
+
+def test_slow_command_trace_and_loop_profile(tmp_path):
+    """
+    Tests that a traced command reports its stages, including stages in worker threads, that a slow
+    command and the event loop samples are written to the profile directory, and that the blocked loop is reported.
+    """
+    profiler = Profiler(directory=str(tmp_path), slow_command=0.05, slow_callback=0.05, interval=0.001)
+
+    def read_store():
+        with trace_stage("store"):
+            time.sleep(0.005)
+
+    async def blocking_command():
+        with trace_stage("render"):
+            time.sleep(0.1)  # Blocks the event loop, so the sampler sees this coroutine
+
+    async def command():
+        profiler.enable()
+        trace = profiler.begin_command("analyze", "Name/Tag")
+        with trace_stage("riot_api"):
+            await asyncio.sleep(0.03)
+        with trace_stage("riot_api"):
+            await asyncio.sleep(0.01)
+        await asyncio.to_thread(read_store)
+        await blocking_command()
+        profiler.end_command(trace)
+        await asyncio.sleep(0.02)  # Lets the heartbeat notice the blocked loop
+        assert profiler.disable()
+        return trace, await asyncio.to_thread(profiler.dump)
+
+    trace, paths = asyncio.run(command())
+
+    assert set(trace.stages) == {"riot_api", "store", "render"}
+    assert trace.counts["riot_api"] == 2
+    assert trace.stages["riot_api"] >= 0.04
+    assert trace.total >= sum(trace.stages.values())
+
+    [record_path] = tmp_path.glob("command-analyze-*.json")
+    record = json.loads(record_path.read_text())
+    assert record["command"] == "analyze"
+    assert record["args"] == "Name/Tag"
+    assert list(record["stages"]) == ["render", "riot_api", "store"]  # Slowest first
+    assert profiler.slow_commands == [record]
+
+    speedscope, pstats_path = paths
+    assert json.loads(open(speedscope).read())["profiles"][0]["samples"]
+    stats = pstats.Stats(pstats_path)
+    assert stats.total_calls > 0
+    assert any(name == "blocking_command" for _, _, name in stats.stats)
+
+    [(_, location, duration)] = profiler.slow_callbacks.records
+    assert location.startswith("blocking_command (test_profiling.py:")
+    assert duration >= 0.05
+
+
+def test_dump_while_sampling(tmp_path):
+    """
+    Tests that the samples can be dumped while the sampler keeps adding new stacks.
+    """
+    stop = threading.Event()
+
+    def spin():
+        return sum(range(10000))
+
+    def busy():
+        # Every call runs under a new function name, so nearly every sample is a new stack
+        for n in itertools.count():
+            if stop.is_set():
+                return
+            types.FunctionType(spin.__code__.replace(co_name=f"spin{n}"), {})()
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)  # Switches threads within a dump's loop over the samples
+    worker = threading.Thread(target=busy)
+    worker.start()
+    sampler = SamplingProfiler(thread_id=worker.ident, interval=0)
+    sampler.start()
+    try:
+        for _ in range(20):
+            sampler.dump_pstats(str(tmp_path / "loop.pstats"))
+            sampler.dump_speedscope(str(tmp_path / "loop.speedscope.json"))
+    finally:
+        sampler.stop()
+        stop.set()
+        worker.join()
+        sys.setswitchinterval(switch_interval)
+    assert len(sampler.stacks) > 1
@@ -0,0 +1,43 @@
+import asyncio
+
+import TFTBot as tb
+from soak import SoakTest
+
+
+def short_soak(**kwargs) -> SoakTest:
+    return SoakTest(duration=3.0, interval=0.5, warmup=1.0, matches=200, players=20, cache_size=50, **kwargs)
+
+
+def test_soak_bounded_state(monkeypatch):
+    """
+    Tests that simulated traffic leaves the tracked messages and the match cache at their bounds without growing,
+    and that the bot's globals are restored afterwards.
+    """
+    monkeypatch.setattr(tb, "MAX_TRACKED_MESSAGES", 20)
+    riot_api, man_msg = tb.RIOT_API, tb.MAN_MSG
+    result = asyncio.run(short_soak().run())
+
+    assert result.passed, result
+    assert result.samples[-1].commands > result.samples[0].commands
+    assert result.tracked_messages == 20
+    assert result.cached_matches <= 50
+    assert tb.RIOT_API is riot_api and tb.MAN_MSG is man_msg
+
+
+def test_soak_detects_leak(monkeypatch):
+    """
+    Tests that a leak in a command handler fails the soak test and is the top allocation site of the report.
+    """
+    leaked = []
+    generate_embed = tb.generate_embed
+
+    def leaking_generate_embed(*args, **kwargs):
+        leaked.append(bytearray(64 * 1024))
+        return generate_embed(*args, **kwargs)
+
+    monkeypatch.setattr(tb, "generate_embed", leaking_generate_embed)
+    result = asyncio.run(short_soak(max_traced_growth=2 * 1024 * 1024).run())
+
+    assert not result.passed
+    assert result.traced_growth > 2 * 1024 * 1024
+    assert "test_soak.py" in result.top_sites[0]
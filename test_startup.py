@@ -0,0 +1,89 @@
+import json
+import asyncio
+
+import TFTBot as tb
+from match_store import MatchStore
+
+
+class FailingRiotAPI():
+    async def warmup(self):
+        raise OSError("network is unreachable")
+
+
+def test_ready_despite_failed_warmup(monkeypatch, tmp_path):
+    """
+    Tests that a failing warmup step is reported and readiness is still signaled with the finished steps.
+    """
+    store = MatchStore(":memory:")
+    ready_file = tmp_path / "ready.json"
+    monkeypatch.setattr(tb, "RIOT_API", FailingRiotAPI())
+    monkeypatch.setattr(tb, "MATCH_STORE", store)
+    monkeypatch.setattr(tb, "BOARD_CHANNEL_ID", None)
+    monkeypatch.setattr(tb, "HTTP_API", None)
+    monkeypatch.setattr(tb, "READINESS", None)
+    monkeypatch.setattr(tb, "READY_FILE", str(ready_file))
+
+    async def start():
+        monkeypatch.setattr(tb, "WARMUP", asyncio.ensure_future(tb.warmup()))
+        await tb.on_ready()
+
+    asyncio.run(start())
+    store.close()
+
+    assert tb.READINESS["failed_steps"] == ["riot_warmup"]
+    assert "riot_warmup" not in tb.READINESS
+    assert tb.READINESS["stored_matches"] == 0
+    assert json.loads(ready_file.read_text())["failed_steps"] == ["riot_warmup"]
+
+
+def test_ready_despite_crashed_warmup(monkeypatch, tmp_path):
+    """
+    Tests that readiness is signaled even if the whole warmup task failed.
+    """
+    monkeypatch.setattr(tb, "HTTP_API", None)
+    monkeypatch.setattr(tb, "READINESS", None)
+    monkeypatch.setattr(tb, "READY_FILE", str(tmp_path / "ready.json"))
+
+    async def crash():
+        raise RuntimeError("warmup crashed")
+
+    async def start():
+        monkeypatch.setattr(tb, "WARMUP", asyncio.ensure_future(crash()))
+        await tb.on_ready()
+
+    asyncio.run(start())
+
+    assert tb.READINESS["failed_steps"] == list(tb.WARMUP_STEPS)
+    assert (tmp_path / "ready.json").exists()
+
+
+def test_close_releases_resources(monkeypatch):
+    """
+    Tests that closing the bot also stops the HTTP API, the Riot API session and the board renderer.
+    """
+    closed = []
+
+    class Closable():
+        def __init__(self, name):
+            self.name = name
+
+        async def stop(self):
+            closed.append(self.name)
+
+        async def close(self):
+            closed.append(self.name)
+
+    class Renderer():
+        def close(self):
+            closed.append("renderer")
+
+    async def bot_close():
+        closed.append("bot")
+
+    monkeypatch.setattr(tb, "BOT_CLOSE", bot_close)
+    monkeypatch.setattr(tb, "HTTP_API", Closable("http_api"))
+    monkeypatch.setattr(tb, "RIOT_API", Closable("riot_api"))
+    monkeypatch.setattr(tb, "BOARD_RENDERER", Renderer())
+    asyncio.run(tb.BOT.close())
+
+    assert closed == ["bot", "http_api", "riot_api", "renderer"]